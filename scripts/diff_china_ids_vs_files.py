@@ -1,7 +1,10 @@
+import io
 import os
-import re
 import csv
-from typing import Dict, Tuple
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
 
 # === Config ===
 BASE_DIR = os.path.expanduser('~/data/ghcnd')
@@ -18,49 +21,27 @@ os.makedirs(OUT_DIR, exist_ok=True)
 
 # === Helpers ===
 
-def _safe_float(x: str):
-    try:
-        return float(x)
-    except Exception:
-        return None
-
-
-def parse_stations_with_names(meta_path: str) -> Dict[str, Tuple[str, float, float]]:
+def parse_stations_with_names(meta_path: str,
+                              keep_ids: Optional[Iterable[str]] = None) -> Dict[str, Tuple[str, float, float]]:
     """Return dict: ID -> (NAME, LAT, LON)
-    Robust to varying whitespace by first trying fixed-width for name,
-    then falling back to regex tokenization.
+    Single fixed-width read per NOAA doc (ID[0:11], LAT[12:20], LON[21:30], NAME[41:71]).
+    If keep_ids is given, lines are prefiltered on the raw ID bytes so only
+    those stations reach the parser.
     """
-    id2meta: Dict[str, Tuple[str, float, float]] = {}
-    with open(meta_path, 'r', encoding='utf-8', errors='ignore') as f:
-        for raw in f:
-            line = raw.rstrip('\n')
-            if not line or len(line) < 11:
-                continue
-            # Attempt 1: fixed-width based on NOAA doc (ID[0:11], LAT[12:20], LON[21:30], ELEV[31:37], STATE[38:40], NAME[41:71])
-            try:
-                sid = line[0:11].strip()
-                lat = _safe_float(line[12:20].strip())
-                lon = _safe_float(line[21:30].strip())
-                name = line[41:71].strip()
-                if sid and lat is not None and lon is not None:
-                    id2meta[sid] = (name, lat, lon)
-                    continue
-            except Exception:
-                pass
-
-            # Attempt 2: regex split, reconstruct name from remaining tokens
-            parts = re.split(r"\s+", line.strip())
-            if len(parts) >= 4:
-                sid = parts[0]
-                lat = _safe_float(parts[1])
-                lon = _safe_float(parts[2])
-                # elevation may be parts[3]; state may be parts[4]; name starts at 5 or 4
-                # Try to detect if parts[4] looks like a 2-letter state code; if not, include in name
-                start_idx_for_name = 5 if len(parts) > 5 else 4
-                name = " ".join(parts[start_idx_for_name:]) if len(parts) > start_idx_for_name else ""
-                if sid and (lat is not None) and (lon is not None):
-                    id2meta[sid] = (name, lat, lon)
-    return id2meta
+    src = meta_path
+    if keep_ids is not None:
+        wanted = {sid.encode('ascii', 'ignore') for sid in keep_ids}
+        with open(meta_path, 'rb') as f:
+            src = io.BytesIO(b''.join(ln for ln in f if ln[:11].rstrip() in wanted))
+    df = pd.read_fwf(src, colspecs=[(0, 11), (12, 20), (21, 30), (41, 71)],
+                     names=['ID', 'LAT', 'LON', 'NAME'], dtype={'ID': str, 'NAME': str},
+                     header=None, encoding='utf-8', encoding_errors='ignore')
+    df['LAT'] = pd.to_numeric(df['LAT'], errors='coerce')
+    df['LON'] = pd.to_numeric(df['LON'], errors='coerce')
+    df = df.dropna(subset=['ID', 'LAT', 'LON'])
+    ids = df['ID'].str.strip()
+    names = df['NAME'].fillna('').str.strip()
+    return dict(zip(ids, zip(names, df['LAT'].tolist(), df['LON'].tolist())))
 
 
 def read_id_list(path: str):
@@ -73,49 +54,50 @@ def read_id_list(path: str):
     return ids
 
 
+def write_id_list(path: str, ids):
+    """One ID per line, streamed through a 1 MiB buffer (no joined string in memory)."""
+    with open(path, 'w', encoding='utf-8', buffering=1024 * 1024) as f:
+        f.writelines(f'{sid}\n' for sid in ids)
+
+
 def list_file_ids(folder: str):
-    ids = []
-    for fn in os.listdir(folder):
-        if fn.lower().endswith('.csv'):
-            ids.append(fn[:-4])
-    return ids
+    with os.scandir(folder) as it:
+        return [e.name[:-4] for e in it if e.name.lower().endswith('.csv') and e.is_file()]
 
 
 # === Load data ===
-id2meta = parse_stations_with_names(META_FILE)
-china_ids = set(read_id_list(CHINA_IDS_FILE))
-file_ids = set(list_file_ids(FILES_DIR))
+# sorted, de-duplicated string arrays so the set ops below are single C merges
+china_ids = np.unique(np.array(read_id_list(CHINA_IDS_FILE), dtype=str))
+file_ids = np.unique(np.array(list_file_ids(FILES_DIR), dtype=str))
+# only stations that appear in the report need names/coordinates
+id2meta = parse_stations_with_names(META_FILE, keep_ids=np.union1d(china_ids, file_ids).tolist())
 
-# === Diff sets ===
-matched = sorted(china_ids & file_ids)
-missing = sorted(china_ids - file_ids)  # expected from metadata but csv not present
-extra   = sorted(file_ids - china_ids)  # csv present but not in china_ids list
+# === Diff sets (outputs are already sorted) ===
+matched = np.intersect1d(china_ids, file_ids, assume_unique=True).tolist()
+missing = np.setdiff1d(china_ids, file_ids, assume_unique=True).tolist()  # expected from metadata but csv not present
+extra   = np.setdiff1d(file_ids, china_ids, assume_unique=True).tolist()  # csv present but not in china_ids list
 
 # === Write plain text lists ===
-with open(MATCHED_TXT, 'w', encoding='utf-8') as f:
-    f.write('\n'.join(matched))
-with open(MISSING_TXT, 'w', encoding='utf-8') as f:
-    f.write('\n'.join(missing))
-with open(EXTRA_TXT, 'w', encoding='utf-8') as f:
-    f.write('\n'.join(extra))
+write_id_list(MATCHED_TXT, matched)
+write_id_list(MISSING_TXT, missing)
+write_id_list(EXTRA_TXT, extra)
 
 # === Build CSV report with names ===
 # Columns: ID, STATUS, NAME, LAT, LON
-rows = []
-for sid in matched:
-    nm, lat, lon = id2meta.get(sid, ("", None, None))
-    rows.append([sid, 'OK', nm, lat, lon])
-for sid in missing:
-    nm, lat, lon = id2meta.get(sid, ("", None, None))
-    rows.append([sid, 'MISSING', nm, lat, lon])
-for sid in extra:
-    nm, lat, lon = id2meta.get(sid, ("", None, None))
-    rows.append([sid, 'EXTRA', nm, lat, lon])
+# Rows are generated lazily in one pass, one id2meta lookup per station
+_NO_META = ("", None, None)
+_groups = ((matched, 'OK'), (missing, 'MISSING'), (extra, 'EXTRA'))
+
+def _report_rows():
+    get = id2meta.get
+    for ids, status in _groups:
+        for sid in ids:
+            yield (sid, status, *get(sid, _NO_META))
 
 with open(REPORT_CSV, 'w', newline='', encoding='utf-8') as f:
     w = csv.writer(f)
     w.writerow(['ID', 'STATUS', 'NAME', 'LAT', 'LON'])
-    w.writerows(rows)
+    w.writerows(_report_rows())
 
 # === Console summary ===
 print(f"China IDs in metadata: {len(china_ids)}")
@@ -4,9 +4,13 @@
 import os
 import re
 import sys
+import gzip
 import time
+import signal
 import tarfile
 import shutil
+import contextlib
+import subprocess
 import logging
 import argparse
 from datetime import datetime
@@ -16,6 +20,13 @@ import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+# 可选：安装了 httpx + h2 时走 HTTP/2（所有请求复用同一条 TCP+TLS 连接）
+try:
+    import httpx
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2
+except ImportError:
+    httpx = None
+
 # ----------------- 可配置参数 -----------------
 BASE_ROOT = os.path.expanduser("/data")
 CSV_BASE_URL = "https://www.ncei.noaa.gov/data/global-hourly/archive/csv/"
@@ -29,10 +40,18 @@ MAX_WORKERS = 4
 # 单文件下载重试与超时
 RETRIES = 8
 TIMEOUT = (10, 60)  # (connect timeout, read timeout) 秒
+BACKOFF_FACTOR = 1.5
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+# 目录索引页缓存有效期（秒）；过期或 --refresh-index 时重新抓取
+INDEX_MAX_AGE = 24 * 3600
 
 # 速率限制：每下完一个文件后小憩（秒），减轻服务器压力
 PAUSE_BETWEEN_FILES = 1.5
 
+# 解压读缓冲（tar.gz 流）
+READ_BUFSIZE = 8 * 1024 * 1024
+
 # ----------------- 路径 -----------------
 RAW_DIR = os.path.join(BASE_ROOT, "isd/csv_raw")
 EXTRACT_DIR = os.path.join(BASE_ROOT, "isd/csv_extracted")
@@ -51,16 +70,32 @@ logging.basicConfig(
     handlers=[logging.FileHandler(LOG_FILE), logging.StreamHandler(sys.stdout)]
 )
 
+INDEX_CACHE = os.path.join(META_DIR, "csv_index.html")
+
 # ----------------- HTTP 会话（带重试） -----------------
-def make_session() -> requests.Session:
+def make_session():
+    if httpx is not None:
+        # httpx 的 transport 只重试连接错误；429/5xx 由 stream_get 自行退避重试
+        transport = httpx.HTTPTransport(
+            http2=True,
+            retries=RETRIES,
+            limits=httpx.Limits(max_connections=MAX_WORKERS * 2),
+        )
+        return httpx.Client(
+            transport=transport,
+            timeout=httpx.Timeout(TIMEOUT[1], connect=TIMEOUT[0]),
+            follow_redirects=True,
+            headers={"User-Agent": "ISD-CSV-Downloader/1.0"},
+        )
+
     sess = requests.Session()
     retry = Retry(
         total=RETRIES,
         connect=RETRIES,
         read=RETRIES,
         status=RETRIES,
-        backoff_factor=1.5,
-        status_forcelist=[429, 500, 502, 503, 504],
+        backoff_factor=BACKOFF_FACTOR,
+        status_forcelist=list(RETRY_STATUS),
         allowed_methods=["HEAD", "GET", "OPTIONS"],
         raise_on_status=False,
     )
@@ -73,27 +108,74 @@ def make_session() -> requests.Session:
 
 SESSION = make_session()
 
+# ----------------- 文件名模式（预编译，整页只扫一次） -----------------
+_YEAR_TAR_RE = re.compile(r'>\s*((\d{4})\.tar\.gz)<')
+_ISD_YEAR_RE = re.compile(r'>\s*(isd_(\d{4})_[\w\-]*csv\.tar\.gz)<')
+# RAW_DIR 中的两种命名：YYYY.tar.gz / isd_YYYY_...csv.tar.gz（及 aria2 的 .aria2 控制文件）
+_RAW_TAR_RE = re.compile(r'(?:(\d{4})\.tar\.gz|isd_(\d{4})_[\w\-]*csv\.tar\.gz)(?:\.aria2)?')
+
 # ----------------- 工具函数 -----------------
-def fetch_directory_index() -> str:
-    """抓取 CSV 目录索引页面 HTML（一次），用于解析每年真实文件名"""
-    logging.info("Fetching CSV index: %s", CSV_BASE_URL)
-    r = SESSION.get(CSV_BASE_URL, timeout=TIMEOUT)
-    r.raise_for_status()
-    return r.text
+@contextlib.contextmanager
+def stream_get(url: str, headers: dict | None = None):
+    """
+    流式 GET，产出 (status_code, response_headers, chunk 迭代器)。
+    屏蔽 httpx / requests 两种会话的接口差异。
+    """
+    chunk = 1024 * 1024
+    if httpx is None:
+        with SESSION.get(url, headers=headers, stream=True, timeout=TIMEOUT) as r:
+            r.raise_for_status()
+            yield r.status_code, r.headers, r.iter_content(chunk_size=chunk)
+        return
+
+    for attempt in range(RETRIES + 1):
+        with SESSION.stream("GET", url, headers=headers) as r:
+            if r.status_code not in RETRY_STATUS or attempt == RETRIES:
+                r.raise_for_status()
+                yield r.status_code, r.headers, r.iter_bytes(chunk)
+                return
+        time.sleep(BACKOFF_FACTOR * (2 ** attempt))
+
+def fetch_directory_index(refresh: bool = False) -> str:
+    """抓取 CSV 目录索引页面 HTML（一次），用于解析每年真实文件名；在 META_DIR 下缓存"""
+    if not refresh and os.path.exists(INDEX_CACHE) \
+            and time.time() - os.path.getmtime(INDEX_CACHE) < INDEX_MAX_AGE:
+        logging.info("Using cached CSV index: %s", INDEX_CACHE)
+        with open(INDEX_CACHE, "r", encoding="utf-8") as f:
+            return f.read()
 
-def pick_filename_for_year(index_html: str, year: int) -> str | None:
+    logging.info("Fetching CSV index: %s", CSV_BASE_URL)
+    with stream_get(CSV_BASE_URL) as (_, _, chunks):
+        html = b"".join(chunks).decode("utf-8", errors="replace")
+    tmp = INDEX_CACHE + ".part"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(html)
+    os.replace(tmp, INDEX_CACHE)
+    return html
+
+def build_year_filename_map(index_html: str) -> dict[int, str]:
     """
-    在目录索引中挑选某年的最新压缩包文件名。
-    优先匹配 `YYYY.tar.gz`；其次兼容 `isd_YYYY_...csv.tar.gz`。
+    一次性扫描目录索引，得到 {年份: 最新压缩包文件名}。
+    优先 `YYYY.tar.gz`；其次兼容 `isd_YYYY_...csv.tar.gz`。
     """
-    m1 = re.findall(rf'>(?:\s*)({year}\.tar\.gz)<', index_html)
-    if m1:
-        # 目录可能列出多次，取最后一个（通常是正确的）
-        return sorted(set(m1))[-1]
-    m2 = re.findall(rf'>(?:\s*)(isd_{year}_[\w\-]*csv\.tar\.gz)<', index_html)
-    if m2:
-        return sorted(set(m2))[-1]
-    return None
+    plain: dict[int, set[str]] = {}
+    for m in _YEAR_TAR_RE.finditer(index_html):
+        plain.setdefault(int(m.group(2)), set()).add(m.group(1))
+    isd: dict[int, set[str]] = {}
+    for m in _ISD_YEAR_RE.finditer(index_html):
+        isd.setdefault(int(m.group(2)), set()).add(m.group(1))
+
+    year2fn: dict[int, str] = {}
+    for year, names in isd.items():
+        year2fn[year] = sorted(names)[-1]
+    # 目录可能列出多次，取最后一个（通常是正确的）
+    for year, names in plain.items():
+        year2fn[year] = sorted(names)[-1]
+    return year2fn
+
+def pick_filename_for_year(year2fn: dict[int, str], year: int) -> str | None:
+    """在预解析的 {年份: 文件名} 映射中查找某年的压缩包文件名。"""
+    return year2fn.get(year)
 
 def human_size(num_bytes: int) -> str:
     for unit in ["B","KB","MB","GB","TB"]:
@@ -115,21 +197,21 @@ def download_with_resume(url: str, dest_path: str) -> None:
     if downloaded > 0:
         headers["Range"] = f"bytes={downloaded}-"
 
-    # 先探测总大小
-    head = SESSION.head(url, timeout=TIMEOUT, allow_redirects=True)
-    head.raise_for_status()
-    total = int(head.headers.get("Content-Length", "0"))
-    accept_ranges = head.headers.get("Accept-Ranges", "none")
-
-    mode = "ab" if downloaded > 0 and accept_ranges != "none" else "wb"
-    if mode == "wb":
-        downloaded = 0  # 不能 Range 时重下
+    # 不再单独 HEAD：总大小直接从 GET 响应头读取
+    with stream_get(url, headers) as (status, resp_headers, chunks):
+        if status == 206:
+            # Content-Range: bytes <start>-<end>/<total>（total 可能为 *）
+            total_str = resp_headers.get("Content-Range", "").rsplit("/", 1)[-1]
+            total = int(total_str) if total_str.isdigit() else 0
+            mode = "ab"
+        else:
+            total = int(resp_headers.get("Content-Length", "0"))
+            mode = "wb"
+            downloaded = 0  # 服务器未按 Range 返回时重下
 
-    with SESSION.get(url, headers=headers, stream=True, timeout=TIMEOUT) as r:
-        r.raise_for_status()
         os.makedirs(os.path.dirname(tmp_path), exist_ok=True)
         with open(tmp_path, mode) as f:
-            for chunk in r.iter_content(chunk_size=1024*1024):
+            for chunk in chunks:
                 if chunk:
                     f.write(chunk)
                     downloaded += len(chunk)
@@ -140,51 +222,156 @@ def download_with_resume(url: str, dest_path: str) -> None:
 
     os.replace(tmp_path, dest_path)
 
-def verify_gzip(path: str) -> bool:
+def verify_gzip(path: str, deep: bool = False) -> bool:
+    """
+    默认只做轻量检查：gzip 魔数 + 试解压前 64 KiB，O(1) 代价。
+    deep=True 时完整遍历 tar 成员（需解压整个归档）。
+    """
     try:
-        with tarfile.open(path, "r:gz") as tar:
-            # 试读头部
-            tar.getmembers()[:1]
+        if deep:
+            with tarfile.open(path, "r:gz") as tar:
+                tar.getmembers()
+            return True
+        with open(path, "rb") as f:
+            if f.read(2) != b"\x1f\x8b":
+                raise OSError("not a gzip file (bad magic)")
+        with gzip.open(path, "rb") as g:
+            g.read(65536)
         return True
     except Exception as e:
         logging.warning("Gzip verification failed for %s: %s", os.path.basename(path), e)
         return False
 
+def count_csv(year_dir: str) -> tuple[int, int]:
+    """单次 scandir 统计目录项总数与其中的 CSV 数量，返回 (n_entries, n_csv)。"""
+    n_entries = n_csv = 0
+    with os.scandir(year_dir) as it:
+        for e in it:
+            n_entries += 1
+            if e.name.endswith(".csv"):
+                n_csv += 1
+    return n_entries, n_csv
+
+@contextlib.contextmanager
+def open_tar_stream(tar_path):
+    """
+    以顺序流方式（mode "r|"）打开 tar.gz。
+    解压优先交给 pigz（PATH 中存在时），其次 zlib-ng（pip install zlib-ng），最后退回标准库 gzip。
+    """
+    pigz = shutil.which("pigz")
+    if pigz:
+        proc = subprocess.Popen([pigz, "-dc", str(tar_path)],
+                                stdout=subprocess.PIPE, bufsize=READ_BUFSIZE)
+        try:
+            with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+                yield tar
+        finally:
+            proc.stdout.close()
+            rc = proc.wait()
+        # tar 读到结束标记后关闭管道，pigz 可能因 SIGPIPE 退出，属正常
+        if rc not in (0, -signal.SIGPIPE):
+            raise OSError(f"pigz exited with status {rc} on {tar_path}")
+        return
+
+    try:
+        from zlib_ng import gzip_ng
+    except ImportError:
+        gzip_ng = None
+    if gzip_ng is not None:
+        with gzip_ng.open(tar_path, "rb") as gz, tarfile.open(fileobj=gz, mode="r|") as tar:
+            yield tar
+        return
+
+    with open(tar_path, "rb", buffering=READ_BUFSIZE) as raw, \
+            tarfile.open(fileobj=raw, mode="r|gz") as tar:
+        yield tar
+
 def extract_year_tar(tar_path: str, year_dir: str) -> int:
     """
     解压到该年份目录；若目录已有文件，视为已完成（跳过）。
     返回解压出的 CSV 文件数量。
     """
     os.makedirs(year_dir, exist_ok=True)
-    if any(os.scandir(year_dir)):
+    n_entries, n_csv = count_csv(year_dir)
+    if n_entries:
         # 已解压过
-        return len([p for p in os.listdir(year_dir) if p.endswith(".csv")])
-
-    count = 0
-    with tarfile.open(tar_path, "r:gz") as tar:
-        def is_within_directory(directory, target):
-            abs_directory = os.path.abspath(directory)
-            abs_target = os.path.abspath(target)
-            return os.path.commonpath([abs_directory]) == os.path.commonpath([abs_directory, abs_target])
-        # 安全解压（防止路径穿越）
-        for member in tar.getmembers():
-            member_path = os.path.join(year_dir, member.name)
-            if not is_within_directory(year_dir, member_path):
-                raise Exception("Unsafe path in tar: " + member.name)
-        tar.extractall(year_dir)
+        return n_csv
+
+    def is_within_directory(directory, target):
+        abs_directory = os.path.abspath(directory)
+        abs_target = os.path.abspath(target)
+        return os.path.commonpath([abs_directory]) == os.path.commonpath([abs_directory, abs_target])
+
+    # 单遍流式解压到同级临时目录：逐个成员做路径安全检查（防止路径穿越）后解出；
+    # 整个归档确认干净后再改名为年份目录，中途出错不会留下半成品（否则下次会被当成已完成）
+    part_dir = year_dir + ".part"
+    shutil.rmtree(part_dir, ignore_errors=True)
+    os.makedirs(part_dir)
+    try:
+        with open_tar_stream(tar_path) as tar:
+            for member in tar:
+                member_path = os.path.join(part_dir, member.name)
+                if not is_within_directory(part_dir, member_path):
+                    raise Exception("Unsafe path in tar: " + member.name)
+                tar.extract(member, part_dir)
+        os.rmdir(year_dir)
+        os.rename(part_dir, year_dir)
+    except BaseException:
+        shutil.rmtree(part_dir, ignore_errors=True)
+        raise
     # 统计
-    for name in os.listdir(year_dir):
-        if name.endswith(".csv"):
-            count += 1
-    return count
+    return count_csv(year_dir)[1]
+
+def aria2_prefetch(year2fn: dict[int, str], years: list[int], jobs: int) -> bool:
+    """
+    用 aria2c 批量预下载尚未解压、也没有完整 tar 的年份：每个文件分段多连接、
+    多文件并行、断点续传。之后的逐年流程会直接复用 RAW_DIR 中已有的文件。
+    返回 aria2c 是否可用（找不到时为 False，逐年流程改走 HTTP）。
+    """
+    todo = []
+    for y in years:
+        fn = year2fn.get(y)
+        if not fn:
+            continue
+        raw_path = os.path.join(RAW_DIR, fn)
+        year_dir = os.path.join(EXTRACT_DIR, str(y))
+        if os.path.isdir(year_dir) and count_csv(year_dir)[0]:
+            continue
+        if os.path.exists(raw_path) and not os.path.exists(raw_path + ".aria2"):
+            continue
+        todo.append(fn)
+    if not todo:
+        return True
+
+    url_list = os.path.join(META_DIR, "aria2_urls.txt")
+    with open(url_list, "w", encoding="utf-8") as f:
+        for fn in todo:
+            f.write(f"{CSV_BASE_URL}{fn}\n  out={fn}\n")
+    logging.info("[aria2] fetching %d archives -> %s", len(todo), RAW_DIR)
+    cmd = ["aria2c", "-d", RAW_DIR, "-i", url_list,
+           "-x", "8", "-s", "8", "-j", str(jobs),
+           "--continue=true", "--max-tries", str(RETRIES),
+           "--user-agent", "ISD-CSV-Downloader/1.0",
+           "--console-log-level=warn", "--summary-interval=60"]
+    try:
+        rc = subprocess.run(cmd).returncode
+    except FileNotFoundError:
+        # 显式 --aria2 但 PATH 上没有 aria2c：回退到逐年 HTTP 下载
+        logging.warning("[aria2] aria2c not found on PATH; falling back to per-year downloads")
+        return False
+    if rc != 0:
+        # 失败的文件保留 .aria2 控制文件，下次运行可续传；这里不中断，逐年流程会报告
+        logging.warning("[aria2] exited with status %d; incomplete files will be resumed next run", rc)
+    return True
 
 # ----------------- 主流程 -----------------
-def process_one_year(year: int, index_html: str) -> tuple[int, str]:
+def process_one_year(year: int, year2fn: dict[int, str], deep_verify: bool = False,
+                     use_aria2: bool = False) -> tuple[int, str]:
     """
     下载并解压某一年。返回 (year, message)。
     """
     try:
-        fn = pick_filename_for_year(index_html, year)
+        fn = pick_filename_for_year(year2fn, year)
         if not fn:
             return year, f"[Warn] {year}: Not found in index. Skipped."
 
@@ -192,8 +379,21 @@ def process_one_year(year: int, index_html: str) -> tuple[int, str]:
         raw_path = os.path.join(RAW_DIR, fn)
         year_dir = os.path.join(EXTRACT_DIR, str(year))
 
-        if os.path.exists(year_dir) and any(os.scandir(year_dir)):
-            return year, f"[=] {year}: already extracted ({len(os.listdir(year_dir))} files)"
+        if os.path.isdir(year_dir):
+            n_entries, _ = count_csv(year_dir)
+            if n_entries:
+                return year, f"[=] {year}: already extracted ({n_entries} files)"
+
+        if os.path.exists(raw_path + ".aria2"):
+            if use_aria2:
+                # aria2 未完成的下载：留给下次 aria2 续传，不要当作完整文件解压
+                return year, f"[✗] {year}: incomplete aria2 download. Re-run to resume."
+            # 本次不用 aria2：其半成品无法按 HTTP Range 续传，删掉后重新下载
+            for p in (raw_path + ".aria2", raw_path):
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
 
         if not os.path.exists(raw_path):
             logging.info("[↓] %s: %s", year, url)
@@ -201,7 +401,7 @@ def process_one_year(year: int, index_html: str) -> tuple[int, str]:
         else:
             logging.info("[=] %s: found existing %s", year, os.path.basename(raw_path))
 
-        if not verify_gzip(raw_path):
+        if not verify_gzip(raw_path, deep=deep_verify):
             # 损坏则删除，提示重下
             sz = os.path.getsize(raw_path) if os.path.exists(raw_path) else 0
             try:
@@ -225,6 +425,12 @@ def main():
     parser.add_argument("--end", type=int, default=END_YEAR_DEFAULT, help="end year (default 2025)")
     parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="parallel download workers")
     parser.add_argument("--keep-tar", action="store_true", help="keep .tar.gz after extraction")
+    parser.add_argument("--refresh-index", action="store_true",
+                        help="re-fetch the directory index even if the cached copy is fresh")
+    parser.add_argument("--aria2", action=argparse.BooleanOptionalAction, default=None,
+                        help="batch-download with aria2c first (default: use it when found on PATH)")
+    parser.add_argument("--deep-verify", action="store_true",
+                        help="walk the whole tar before extraction instead of a gzip header check")
     args = parser.parse_args()
 
     start, end = args.start, args.end
@@ -235,14 +441,19 @@ def main():
     logging.info("[Years] %d..%d  [Workers]=%d", start, end, args.workers)
     logging.info("[Dirs] RAW=%s  EXTRACT=%s  META=%s  REPORT=%s", RAW_DIR, EXTRACT_DIR, META_DIR, REPORT_DIR)
 
-    # 抓一次索引，后续直接解析
-    index_html = fetch_directory_index()
+    # 抓一次索引，解析一次
+    year2fn = build_year_filename_map(fetch_directory_index(args.refresh_index))
+
+    # 并行执行：ISD 归档随年份单调增大，按大到小提交（LPT），避免大文件落在队尾拖长总耗时
+    years = sorted(range(start, end + 1), reverse=True)
+
+    use_aria2 = args.aria2 if args.aria2 is not None else shutil.which("aria2c") is not None
+    if use_aria2:
+        use_aria2 = aria2_prefetch(year2fn, years, args.workers)
 
-    # 并行执行
-    years = list(range(start, end + 1))
     results = []
     with ThreadPoolExecutor(max_workers=args.workers) as ex:
-        futs = {ex.submit(process_one_year, y, index_html): y for y in years}
+        futs = {ex.submit(process_one_year, y, year2fn, args.deep_verify, use_aria2): y for y in years}
         for fut in as_completed(futs):
             year = futs[fut]
             _, msg = fut.result()
@@ -251,20 +462,21 @@ def main():
 
     # 可选：删除已解压完成的 tar 以省空间
     if not args.keep_tar:
+        # 两种可能的命名；RAW_DIR 只列一次，按年份归组
+        by_year: dict[int, list[str]] = {}
+        for name in os.listdir(RAW_DIR):
+            m = _RAW_TAR_RE.fullmatch(name)
+            if m:
+                by_year.setdefault(int(m.group(1) or m.group(2)), []).append(name)
         for y in years:
-            # 两种可能的命名
-            pat1 = os.path.join(RAW_DIR, f"{y}.tar.gz")
-            pat2_candidates = [p for p in os.listdir(RAW_DIR) if re.fullmatch(rf"isd_{y}_[\w\-]*csv\.tar\.gz", p or "")]
-            for p in [pat1] + [os.path.join(RAW_DIR, c) for c in pat2_candidates]:
-                if os.path.exists(p):
-                    try:
-                        os.remove(p)
-                    except OSError:
-                        pass
+            for name in by_year.get(y, ()):
+                try:
+                    os.remove(os.path.join(RAW_DIR, name))
+                except OSError:
+                    pass
 
     logging.info("=== ISD CSV download finished: %s ===", datetime.now().strftime("%F %T"))
     logging.info("Log file: %s", LOG_FILE)
 
 if __name__ == "__main__":
     main()
-df 
\ No newline at end of file
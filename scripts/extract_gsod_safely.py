@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import os, sys, tarfile, time, stat
+import contextlib, shutil, signal, subprocess
 
 BASE = os.path.expanduser("~/yangtze-1998-wrfhydro-rri/data/gsod")
 RAW_DIR = os.path.join(BASE, "raw")
@@ -10,6 +11,44 @@ os.makedirs(LOG_DIR, exist_ok=True)
 
 LOG = os.path.join(LOG_DIR, f"extract_gsod_{time.strftime('%Y%m%d_%H%M')}.log")
 
+# 读写缓冲：tar.gz 读入 8 MiB，成员拷贝/写出 4 MiB（减少系统调用）
+READ_BUFSIZE = 8 * 1024 * 1024
+COPY_BUFSIZE = 4 * 1024 * 1024
+
+@contextlib.contextmanager
+def open_tar_stream(tar_path):
+    """
+    以顺序流方式（mode "r|"）打开 tar.gz。
+    解压优先交给 pigz（PATH 中存在时），其次 zlib-ng（pip install zlib-ng），最后退回标准库 gzip。
+    """
+    pigz = shutil.which("pigz")
+    if pigz:
+        proc = subprocess.Popen([pigz, "-dc", str(tar_path)],
+                                stdout=subprocess.PIPE, bufsize=READ_BUFSIZE)
+        try:
+            with tarfile.open(fileobj=proc.stdout, mode="r|") as tar:
+                yield tar
+        finally:
+            proc.stdout.close()
+            rc = proc.wait()
+        # tar 读到结束标记后关闭管道，pigz 可能因 SIGPIPE 退出，属正常
+        if rc not in (0, -signal.SIGPIPE):
+            raise OSError(f"pigz exited with status {rc} on {tar_path}")
+        return
+
+    try:
+        from zlib_ng import gzip_ng
+    except ImportError:
+        gzip_ng = None
+    if gzip_ng is not None:
+        with gzip_ng.open(tar_path, "rb") as gz, tarfile.open(fileobj=gz, mode="r|") as tar:
+            yield tar
+        return
+
+    with open(tar_path, "rb", buffering=READ_BUFSIZE) as raw, \
+            tarfile.open(fileobj=raw, mode="r|gz") as tar:
+        yield tar
+
 def is_safe_path(basedir, path):
     # 防止目录穿越（/绝对路径、.. 回退）
     return os.path.realpath(path).startswith(os.path.realpath(basedir) + os.sep)
@@ -17,6 +56,7 @@ def is_safe_path(basedir, path):
 def safe_extract(tar: tarfile.TarFile, out_dir: str):
     count = 0
     skipped = 0
+    made = set()  # 已创建的目录，避免每个文件都 makedirs
     for m in tar:
         # 仅处理普通文件和目录
         if not (m.isdir() or m.isreg()):
@@ -32,7 +72,9 @@ def safe_extract(tar: tarfile.TarFile, out_dir: str):
 
         # 目录则确保存在
         if m.isdir():
-            os.makedirs(target, exist_ok=True)
+            if target not in made:
+                os.makedirs(target, exist_ok=True)
+                made.add(target)
             continue
 
         # 文件：若已存在且大小一致，跳过（断点/可重入）
@@ -40,16 +82,19 @@ def safe_extract(tar: tarfile.TarFile, out_dir: str):
             skipped += 1
             continue
 
-        # 确保父目录
-        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # 确保父目录（每个目录只建一次）
+        parent = os.path.dirname(target)
+        if parent not in made:
+            os.makedirs(parent, exist_ok=True)
+            made.add(parent)
 
         # 解压该成员（流式，避免内存爆）
-        with tar.extractfile(m) as src, open(target, "wb") as dst:
+        with tar.extractfile(m) as src, open(target, "wb", buffering=COPY_BUFSIZE) as dst:
             if src is None:
                 print(f"[WARN] Null member: {m.name}", file=sys.stderr)
                 continue
             while True:
-                chunk = src.read(1024 * 1024)
+                chunk = src.read(COPY_BUFSIZE)
                 if not chunk:
                     break
                 dst.write(chunk)
@@ -92,7 +137,7 @@ def main():
 
             try:
                 # 只读 gzip（流式，避免一次性展开）
-                with tarfile.open(tar_path, mode="r:gz") as tar:
+                with open_tar_stream(tar_path) as tar:
                     extracted, skipped = safe_extract(tar, out_dir)
                 msg = f"[DONE]  {f}: extracted={extracted}, skipped={skipped}"
                 print(msg); log.write(msg + "\n"); log.flush()
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
+import errno
 import os
 import shutil
+import argparse
+from concurrent.futures import ThreadPoolExecutor
 
 # 根路径
 base_dir = os.path.expanduser("~/yangtze-1998-wrfhydro-rri/data/ghcnd/splits")
@@ -11,29 +14,81 @@ folders = {
     "stations_yangtze_plus_buffer": "stations_yangzte_plus_buffer_china_only"
 }
 
-# 定义目标国家/地区代码
-china_codes = {"CH", "HK", "MC", "TW"}
+# 定义目标国家/地区代码（tuple 供 str.startswith 在 C 层一次匹配）
+china_codes = ("CH", "HK", "MC", "TW")
 
-def filter_stations(src_folder, dst_folder):
+# 拷贝以元数据操作为主（open/stat/create），用线程重叠等待
+COPY_WORKERS = (os.cpu_count() or 4) * 4
+
+def _fast_copy(src, dst, allow_hardlink=True):
+    """硬链接优先（零拷贝）；其次 copy_file_range（内核态拷贝，XFS/Btrfs 上可走 reflink）；最后 copy2。
+    不直接写已存在的 dst（重跑时它可能就是 src 的硬链接）：先写临时名，再 os.replace 覆盖"""
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return  # 上次已硬链接过
+    tmp = dst + ".tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        if allow_hardlink:
+            try:
+                os.link(src, tmp)
+                os.replace(tmp, dst)
+                return
+            except OSError as e:
+                # 跨设备 / 文件系统不支持 / 无权限 -> 改走拷贝
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES,
+                                   errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+                    raise
+        try:
+            with open(src, "rb") as s, open(tmp, "wb") as d:
+                remaining = os.fstat(s.fileno()).st_size
+                while remaining > 0:
+                    n = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                    if n == 0:
+                        break
+                    remaining -= n
+            if remaining == 0:
+                shutil.copystat(src, tmp)
+                os.replace(tmp, dst)
+                return
+        except (OSError, AttributeError):
+            pass
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+
+def filter_stations(src_folder, dst_folder, allow_hardlink=True):
     src_path = os.path.join(base_dir, src_folder)
     dst_path = os.path.join(base_dir, dst_folder)
     os.makedirs(dst_path, exist_ok=True)
 
-    files = [f for f in os.listdir(src_path) if f.endswith(".csv")]
-    kept = 0
+    # 目标目录只列一次，已存在的不再重复拷贝
+    existing = set(os.listdir(dst_path))
 
-    for f in files:
-        # GHCN 站点ID的前两个字母为国家/地区代码
-        country_code = f[:2]
-        if country_code in china_codes:
-            shutil.copy2(os.path.join(src_path, f), os.path.join(dst_path, f))
-            kept += 1
+    # GHCN 站点ID的前两个字母为国家/地区代码
+    with os.scandir(src_path) as it:
+        selected = [e.name for e in it
+                    if e.name.startswith(china_codes) and e.name.endswith(".csv")]
+    pairs = [(os.path.join(src_path, f), os.path.join(dst_path, f))
+             for f in selected if f not in existing]
 
-    print(f"Folder '{src_folder}': kept {kept} Chinese/region stations")
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as ex:
+        list(ex.map(lambda p: _fast_copy(p[0], p[1], allow_hardlink), pairs))
+
+    kept = len(selected)
+    print(f"Folder '{src_folder}': kept {kept} Chinese/region stations "
+          f"(copied {len(pairs)}, already present {kept - len(pairs)})")
 
 def main():
+    parser = argparse.ArgumentParser(description="Filter China/HK/MC/TW station CSVs into *_china_only folders")
+    parser.add_argument("--allow-hardlink", action=argparse.BooleanOptionalAction, default=True,
+                        help="hardlink instead of copying when possible (use --no-allow-hardlink across filesystems)")
+    args = parser.parse_args()
+
     for src, dst in folders.items():
-        filter_stations(src, dst)
+        filter_stations(src, dst, args.allow_hardlink)
 
 if __name__ == "__main__":
     main()
@@ -4,15 +4,28 @@
 import os
 import sys
 import math
-from collections import defaultdict, OrderedDict
+import shutil
+from collections import OrderedDict
 import glob
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point
 import matplotlib.pyplot as plt
 
+# 矢量读取引擎：优先 pyogrio（整层向量化读取，可走 Arrow），否则退回 fiona
+try:
+    import pyogrio  # noqa: F401
+    _READ_KW = {"engine": "pyogrio"}
+    try:
+        import pyarrow  # noqa: F401
+        _READ_KW["use_arrow"] = True
+    except ImportError:
+        pass
+except ImportError:
+    _READ_KW = {}
+
 # ========== 可配置区域 ==========
 BASE_DIR = os.path.expanduser("~/yangtze-1998-wrfhydro-rri/data/ghcnd")
 SPLITS_DIR = os.path.join(BASE_DIR, "splits")
@@ -58,7 +71,8 @@ NE_COUNTRY_SHP = os.path.expanduser(
 )
 
 # —— 绘图样式（可按需调整）——
-DPI = 300
+DPI = 150        # 逐年批量出图用于检查；--hires 恢复出版用 300
+HIRES_DPI = 300
 LAND_FC = "#f0efe8"
 LAND_EC = "#c6c3b6"
 COUNTRY_EC = "#8b8b8b"
@@ -74,45 +88,62 @@ TRIB_LW = 1.2
 STATION_MS = 8
 STATION_ALPHA = 0.85
 
+# —— PNG 输出 ——
+PNG_WRITERS = 4          # 后台编码线程数（zlib 压缩释放 GIL，与下一帧渲染重叠）
+PNG_COMPRESS_LEVEL = 3   # 默认 6；3 体积略大但编码约快一倍，像素不变
+
 
 # ========== 工具函数 ==========
 def ensure_dir(path: str):
     os.makedirs(path, exist_ok=True)
 
 
-def in_bbox(lat: float, lon: float, bbox: dict) -> bool:
-    return (bbox["lat_min"] <= lat <= bbox["lat_max"]) and (bbox["lon_min"] <= lon <= bbox["lon_max"])
+def link_or_copy(src: str, dst: str):
+    """同内容的图直接硬链接；跨文件系统等情况退回复制"""
+    if os.path.lexists(dst):
+        os.remove(dst)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def in_bbox(lat, lon, bbox: dict):
+    """标量返回 bool；传入 numpy 数组时返回整列布尔掩码（一次向量化比较）"""
+    return ((lat >= bbox["lat_min"]) & (lat <= bbox["lat_max"])
+            & (lon >= bbox["lon_min"]) & (lon <= bbox["lon_max"]))
 
 
 def parse_inventory(inventory_path):
     """
     解析 GHCND 的 ghcnd-inventory.txt
     标准格式（空白分隔）：ID LAT LON ELEMENT FIRSTYEAR LASTYEAR
-    同一站点会有多行（不同 ELEMENT），我们按行返回，主流程会合并到 yearly 集合。
-    返回迭代器： (sid, lat, lon, elem, first_year, last_year)
+    同一站点会有多行（不同 ELEMENT），按行返回，主流程会合并到 yearly 集合。
+    返回 DataFrame，列： sid, lat, lon, elem, y1, y2（C 引擎一次性解析）
+    解析结果缓存为同目录 <inventory>.parquet，比 txt 新时直接读缓存。
     """
-    out = []
-    with open(inventory_path, "r", encoding="utf-8", errors="ignore") as fr:
-        for line in fr:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            parts = line.split()
-            # 容错：部分 inventory 可能有 5 或 6 列
-            if len(parts) < 5:
-                continue
-            sid = parts[0]
-            try:
-                lat = float(parts[1])
-                lon = float(parts[2])
-                elem = parts[3] if len(parts) >= 6 else "NA"
-                y1 = int(parts[-2])
-                y2 = int(parts[-1])
-                out.append((sid, lat, lon, elem, y1, y2))
-            except Exception:
-                # 忽略异常行
-                continue
-    return out
+    cache = inventory_path + ".parquet"
+    try:
+        if os.path.getmtime(cache) > os.path.getmtime(inventory_path):
+            return pd.read_parquet(cache)
+    except Exception:
+        pass
+
+    df = pd.read_csv(
+        inventory_path, sep=r"\s+", engine="c", header=None, comment="#",
+        names=["sid", "lat", "lon", "elem", "y1", "y2"],
+        dtype=str, on_bad_lines="skip", encoding="utf-8", encoding_errors="ignore",
+    )
+    for col in ("lat", "lon", "y1", "y2"):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    # 忽略异常行（列数不足 / 非数值）
+    df = df.dropna(subset=["sid", "lat", "lon", "y1", "y2"])
+    df = df.astype({"lat": "float64", "lon": "float64", "y1": "int32", "y2": "int32"}).reset_index(drop=True)
+    try:
+        df.to_parquet(cache, compression="zstd")
+    except Exception as e:
+        print(f"[warn] inventory cache not written: {e}")
+    return df
 
 
 def read_station_set_from_folder(folder):
@@ -120,19 +151,41 @@ def read_station_set_from_folder(folder):
     根据文件名收集站点 ID（不读内容）。
     例如：folder 内含 'CN000001.csv' 或 'CN000001.txt' 等，去除扩展名即为 ID。
     """
-    ids = set()
     if not os.path.isdir(folder):
-        return ids
-    for p in os.listdir(folder):
-        if p.startswith("."):
-            continue
-        sid = os.path.splitext(p)[0]
-        if sid:
-            ids.add(sid)
+        return set()
+    # scandir 直接给出文件名与类型，免去逐个 splitext/stat
+    with os.scandir(folder) as it:
+        ids = {e.name.rsplit(".", 1)[0] for e in it
+               if not e.name.startswith(".") and not e.is_dir()}
+    ids.discard("")
     return ids
 
 
 # ========== 底图加载（全局缓存一次） ==========
+def _bbox_tuple(bbox):
+    """BBOX dict -> (minx, miny, maxx, maxy)"""
+    return (bbox["lon_min"], bbox["lat_min"], bbox["lon_max"], bbox["lat_max"])
+
+
+def _read_file(path, bbox=None, **kwargs):
+    """
+    gpd.read_file 包装：按 _READ_KW 选择引擎；Arrow 读取失败（如 GDAL < 3.6）时退回普通读取。
+    bbox=(minx, miny, maxx, maxy) 下推到 GDAL，借助图层空间索引只读与窗口相交的要素
+    （底图均为 WGS84 经纬度，与 BBOX 同坐标系）；驱动不支持时读全量后用 .cx 裁剪。
+    """
+    if bbox is not None:
+        try:
+            return gpd.read_file(path, **_READ_KW, bbox=bbox, **kwargs)
+        except Exception:
+            return _read_file(path, **kwargs).cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+    try:
+        return gpd.read_file(path, **_READ_KW, **kwargs)
+    except Exception:
+        if not _READ_KW.get("use_arrow"):
+            raise
+        return gpd.read_file(path, engine=_READ_KW["engine"], **kwargs)
+
+
 class BaseLayers:
     def __init__(self):
         self.land = None
@@ -141,24 +194,29 @@ class BaseLayers:
         self.main = None
         self.trib = None
 
-    def load(self):
+    def load(self, bbox=None):
+        # 只读与研究窗口相交的要素
+        bb = _bbox_tuple(bbox or BBOX)
+        # 流域/河网顶点远多于图面像素：按半个像素（度）简化一次，逐年重绘都受益
+        tol = (bb[2] - bb[0]) / FIGSIZE[0] / DPI * 0.5
+
         # Natural Earth
         if os.path.exists(NE_LAND_SHP):
-            self.land = gpd.read_file(NE_LAND_SHP)
+            self.land = _read_file(NE_LAND_SHP, bbox=bb)
             self.land = self._to_wgs84(self.land)
         else:
             print(f"[warn] land shp not found: {NE_LAND_SHP}")
 
         if os.path.exists(NE_COUNTRY_SHP):
-            self.country = gpd.read_file(NE_COUNTRY_SHP)
+            self.country = _read_file(NE_COUNTRY_SHP, bbox=bb)
             self.country = self._to_wgs84(self.country)
         else:
             print(f"[warn] country shp not found: {NE_COUNTRY_SHP}")
 
         # 长江流域 union
         if YANGTZE_BASIN_UNION_SHP and os.path.exists(YANGTZE_BASIN_UNION_SHP):
-            self.basin = gpd.read_file(YANGTZE_BASIN_UNION_SHP)
-            self.basin = self._to_wgs84(self.basin)
+            self.basin = _read_file(YANGTZE_BASIN_UNION_SHP, bbox=bb)
+            self.basin = self._simplify(self._to_wgs84(self.basin), tol)
         else:
             if YANGTZE_BASIN_UNION_SHP:
                 print(f"[warn] basin shp not found: {YANGTZE_BASIN_UNION_SHP}")
@@ -166,8 +224,8 @@ class BaseLayers:
         # 主要干流
         if YANGTZE_MAIN_GPKG and os.path.exists(YANGTZE_MAIN_GPKG):
             try:
-                self.main = gpd.read_file(YANGTZE_MAIN_GPKG, layer=YANGTZE_MAIN_LAYER)
-                self.main = self._to_wgs84(self.main)
+                self.main = _read_file(YANGTZE_MAIN_GPKG, layer=YANGTZE_MAIN_LAYER, bbox=bb)
+                self.main = self._simplify(self._to_wgs84(self.main), tol)
             except Exception as e:
                 print(f"[warn] load mainstem failed: {e}")
         else:
@@ -177,8 +235,8 @@ class BaseLayers:
         # 主要支流
         if YANGTZE_TRIB_GPKG and os.path.exists(YANGTZE_TRIB_GPKG):
             try:
-                self.trib = gpd.read_file(YANGTZE_TRIB_GPKG, layer=YANGTZE_TRIB_LAYER)
-                self.trib = self._to_wgs84(self.trib)
+                self.trib = _read_file(YANGTZE_TRIB_GPKG, layer=YANGTZE_TRIB_LAYER, bbox=bb)
+                self.trib = self._simplify(self._to_wgs84(self.trib), tol)
             except Exception as e:
                 print(f"[warn] load tribs failed: {e}")
         else:
@@ -198,6 +256,15 @@ class BaseLayers:
             pass
         return gdf
 
+    @staticmethod
+    def _simplify(gdf, tol):
+        try:
+            gdf = gdf.copy()
+            gdf.geometry = gdf.geometry.simplify(tol, preserve_topology=True)
+        except Exception:
+            pass
+        return gdf
+
 
 BASE = BaseLayers()
 
@@ -227,13 +294,21 @@ def _nice_step(span):
     return step
 
 
-def draw_map(year, pts_lonlat, out_png, bbox):
-    """
-    pts_lonlat: [(lon, lat), ...]
-    """
-    ensure_dir(os.path.dirname(out_png))
+# 底图 Figure 缓存：{bbox 元组: (fig, ax)}。底图只画一次，逐年只替换站点层。
+_BASE_FIGS = {}
+# bbox -> 逐年渲染状态：
+#   key    站点层标识；相同则沿用上一次画好的站点层与图例
+#   n_base 底图 collection 数
+#   bg     不含站点/图例/标题的底图像素（blit 背景），首次出图时缓存
+_STATION_LAYER = {}
 
-    fig, ax = plt.subplots(figsize=FIGSIZE, dpi=DPI)
+
+def _base_figure(bbox):
+    key = _bbox_tuple(bbox)
+    if key in _BASE_FIGS:
+        return _BASE_FIGS[key]
+
+    fig, ax = plt.subplots(figsize=FIGSIZE, dpi=DPI, layout="constrained")
 
     # 底图：陆地
     if BASE.land is not None and not BASE.land.empty:
@@ -255,21 +330,92 @@ def draw_map(year, pts_lonlat, out_png, bbox):
     if BASE.trib is not None and not BASE.trib.empty:
         BASE.trib.plot(ax=ax, color=TRIB_EC, linewidth=TRIB_LW, zorder=3)
 
-    # 站点
-    if pts_lonlat:
-        gdf_pts = gpd.GeoDataFrame(geometry=[Point(x, y) for x, y in pts_lonlat], crs="EPSG:4326")
-        gdf_pts.plot(ax=ax, marker="o", color=STATION_FC, markersize=STATION_MS, alpha=STATION_ALPHA, zorder=4)
+    # zorder < 3.5 的底图层（陆地/国界/流域/河网）按位图输出，站点与文字保持矢量
+    ax.set_rasterization_zorder(3.5)
 
     _setup_axes(ax, bbox)
+    _BASE_FIGS[key] = (fig, ax)
+    _STATION_LAYER[key] = {"key": None, "n_base": len(ax.collections), "bg": None}
+    return fig, ax
+
+
+def draw_map(year, pts_lonlat, out_png, bbox, key=None, pool=None):
+    """
+    pts_lonlat: [(lon, lat), ...] 或 (n, 2) 数组
+    key: 站点集合的可哈希标识（如站点位图 bytes）；与上一次相同则只改标题重存
+    pool: 传入线程池时 PNG 编码/写盘交给后台线程，返回 Future；否则同步写出
+    """
+    ensure_dir(os.path.dirname(out_png))
+
+    fig, ax = _base_figure(bbox)
+    st = _STATION_LAYER[_bbox_tuple(bbox)]
+    if key is None or st["key"] != key:
+        _draw_station_layer(ax, pts_lonlat, st["n_base"])
+        st["key"] = key
+
     ax.set_title(f"GHCNd Stations — {year}")
 
+    if st["bg"] is None:
+        _prepare_blit(fig, ax, st)
+
+    # blit：恢复底图背景，只重画站点层/图例/标题后整幅写出
+    fig.canvas.restore_region(st["bg"])
+    for art in _overlay_artists(ax, st["n_base"]):
+        ax.draw_artist(art)
+    img = np.asarray(fig.canvas.buffer_rgba())
+    if pool is None:
+        _write_png(out_png, img, fig.dpi)
+        return None
+    # 画布缓冲区下一帧会被覆盖，交给后台线程前先复制
+    return pool.submit(_write_png, out_png, img.copy(), fig.dpi)
+
+
+def _write_png(out_png, img, dpi):
+    plt.imsave(out_png, img, dpi=dpi, pil_kwargs={"compress_level": PNG_COMPRESS_LEVEL})
+
+
+def _overlay_artists(ax, n_base):
+    arts = list(ax.collections[n_base:])
+    if ax.get_legend() is not None:
+        arts.append(ax.get_legend())
+    arts.append(ax.title)
+    return arts
+
+
+def _prepare_blit(fig, ax, st):
+    """
+    每个底图 Figure 只做一次：首帧完整绘制让 constrained layout 定版面后冻结布局，
+    再隐藏站点/图例/标题整图渲染一次缓存为背景。
+    """
+    fig.canvas.draw()
+    fig.set_layout_engine("none")
+    arts = _overlay_artists(ax, st["n_base"])
+    for art in arts:
+        art.set_visible(False)
+    fig.canvas.draw()
+    st["bg"] = fig.canvas.copy_from_bbox(fig.bbox)
+    for art in arts:
+        art.set_visible(True)
+
+
+def _draw_station_layer(ax, pts_lonlat, n_base):
+    # 移除上一年的站点层，底图复用
+    for coll in ax.collections[n_base:]:
+        coll.remove()
+
+    # 站点：直接 scatter 经纬度数组（无需逐点构造 shapely Point / GeoDataFrame）
+    if len(pts_lonlat):
+        xy = np.asarray(pts_lonlat, dtype=float)
+        ax.scatter(xy[:, 0], xy[:, 1], marker="o", color=STATION_FC, s=STATION_MS,
+                   alpha=STATION_ALPHA, zorder=4)
+
     # ===== 图例 =====
     handles = []
     labels = []
 
     from matplotlib.lines import Line2D
 
-    if pts_lonlat:
+    if len(pts_lonlat):
         handles.append(Line2D([], [], marker='o', color='none',
                             markerfacecolor=STATION_FC, markersize=STATION_MS/1.6))
         labels.append("GHCNd Station")
@@ -288,10 +434,6 @@ def draw_map(year, pts_lonlat, out_png, bbox):
 
     ax.legend(handles, labels, loc="upper right", frameon=True, framealpha=0.9)
 
-    plt.tight_layout()
-    fig.savefig(out_png, bbox_inches="tight")
-    plt.close(fig)
-
 
 # ========== 测试图生成功能 ==========
 def _test_generate_demo():
@@ -315,6 +457,10 @@ def _synthetic_points(bbox, n=50, seed=0):
 
 # ========== 主流程 ==========
 def main():
+    global DPI
+    if "--hires" in sys.argv:
+        DPI = HIRES_DPI
+
     if "--test" in sys.argv:
         _test_generate_demo()
         return
@@ -338,53 +484,73 @@ def main():
         print(f"[{setup_name}] station universe size = {len(setup_station_sets[setup_name])}")
 
     # 3) 仅处理两个 setup 并集中的站点
+    # 先用 numpy 掩码按 bbox 裁掉大部分行，再对剩余行做 ID 成员判断
     universe = set().union(*setup_station_sets.values())
-    station_coord = {}
-    yearly_stations_any = defaultdict(set)
-
-    min_year, max_year = 3000, -1
-    for sid, lat, lon, elem, y1, y2 in inv:
-        if sid not in universe:
-            continue
-        if not in_bbox(lat, lon, BBOX):
-            continue
-        if sid not in station_coord:
-            station_coord[sid] = (lon, lat)
-        # 使用元数据的起止年填充
-        for y in range(y1, y2 + 1):
-            yearly_stations_any[y].add(sid)
-            if y < min_year: min_year = y
-            if y > max_year: max_year = y
-
-    if max_year < 0:
+    inv = inv[in_bbox(inv["lat"].to_numpy(), inv["lon"].to_numpy(), BBOX)]
+    inv = inv[inv["sid"].isin(universe)]
+
+    # 站点编号化：factorize 与 drop_duplicates 都按首次出现排序，坐标数组与 sid_names 一一对齐
+    sid_idx, sid_names = pd.factorize(inv["sid"])
+    first = inv.drop_duplicates("sid")
+    station_xy = np.column_stack([first["lon"].to_numpy(), first["lat"].to_numpy()])
+
+    # 使用元数据的起止年填充：每行 [y1, y2] 区间用 np.repeat 一次性展开为 (year, 站点序号) 对
+    y1 = inv["y1"].to_numpy()
+    lens = np.maximum(inv["y2"].to_numpy() - y1 + 1, 0)
+    starts = np.cumsum(lens) - lens
+    exp_years = np.repeat(y1, lens) + (np.arange(lens.sum()) - np.repeat(starts, lens))
+    exp_sids = np.repeat(sid_idx, lens)
+
+    if not exp_years.size:
         print("No matching years found for the given station sets.", file=sys.stderr)
         sys.exit(1)
 
     # 限制到 1901–2025（若 metadata 更宽）
-    min_year = max(1901, min_year)
-    max_year = min(2025, max_year)
+    min_year = max(1901, int(exp_years.min()))
+    max_year = min(2025, int(exp_years.max()))
+
+    # (年, 站) 布尔矩阵：每年的站点集合即一行，setup 过滤为按位与
+    presence = np.zeros((max(0, max_year - min_year + 1), len(sid_names)), dtype=bool)
+    keep = (exp_years >= min_year) & (exp_years <= max_year)
+    presence[exp_years[keep] - min_year, exp_sids[keep]] = True
+
+    # GHCND 站号前两位为国家/地区码：一次性截取前缀（U2）判定
+    china_mask = np.isin(np.asarray(sid_names, dtype="U2"), sorted(CHINA_CODES))
 
     # 4) 输出并画图
     ensure_dir(OUT_DIR)
+    # (year, 站点集合位图) -> 已画出的 PNG；标题只含年份，故同年同站点集合的图逐像素一致
+    drawn = {}
     for setup_name, (folder, out_subdir) in SETUPS.items():
         out_txt = os.path.join(OUT_DIR, f"yearly_counts_{setup_name}.txt")
         fig_dir = os.path.join(OUT_DIR, out_subdir)
         ensure_dir(fig_dir)
 
-        setup_ids = setup_station_sets[setup_name]
+        setup_mask = np.asarray(sid_names.isin(setup_station_sets[setup_name]))
+        if "china_only" in setup_name:
+            setup_mask &= china_mask
+        pool = ThreadPoolExecutor(max_workers=PNG_WRITERS)
+        futures = []
         with open(out_txt, "w", encoding="utf-8") as fw:
             fw.write("# year  n_stations\n")
             for y in range(min_year, max_year + 1):
-                ids = yearly_stations_any.get(y, set()) & setup_ids
-                if "china_only" in setup_name:
-                    # GHCND 站号前两位为国家/地区码
-                    ids = {sid for sid in ids if sid[:2] in CHINA_CODES}
+                row = presence[y - min_year] & setup_mask
 
-                fw.write(f"{y} {len(ids)}\n")
+                fw.write(f"{y} {int(row.sum())}\n")
 
-                pts = [station_coord[sid] for sid in ids if sid in station_coord]
                 out_png = os.path.join(fig_dir, f"stations_{y}.png")
-                draw_map(y, pts, out_png, BBOX)
+                key = np.packbits(row).tobytes()
+                if (y, key) in drawn:
+                    link_or_copy(drawn[(y, key)], out_png)
+                    continue
+                pts = station_xy[row]
+                futures.append(draw_map(y, pts, out_png, BBOX, key=key, pool=pool))
+                drawn[(y, key)] = out_png
+
+        # 等本 setup 的 PNG 全部落盘（下一 setup 可能硬链接这些文件）；写盘异常在此抛出
+        pool.shutdown(wait=True)
+        for fut in futures:
+            fut.result()
 
         print(f"[{setup_name}] wrote counts: {out_txt}")
         print(f"[{setup_name}] wrote maps to: {fig_dir}")
@@ -9,14 +9,21 @@
 - 数据目录已改为 /data/gsod/（自动兼容含/不含 extracted/）
 - 新增国家代码 country（优先自动从 /data/gsod/metadata/isd-history.csv 解析；
   也可用 --country-map 手动提供 station_id,country 的CSV）
+- 站点坐标优先取 isd-history 的 LAT/LON（只列目录、不开文件），
+  历史表中没有坐标的站点才回退读 CSV 首行；--file-coords 强制全部读首行
+- 每年同时写 gsod_index_<year>.parquet（需 pyarrow），供绘图脚本按 bbox 下推过滤；
+  --to-parquet 只把已有的 CSV 索引转成 Parquet，不重新扫描
 
 示例：
   python gsod_build_index.py --years 1929-2025
   python gsod_build_index.py --years 1931,1954,1998 --bbox 85.5 130.0 18.0 40.0
   python gsod_build_index.py --years 1950-1960 --country-map /path/to/sid_country.csv
+  python gsod_build_index.py --years 1929-2025 --to-parquet
 """
 
-import os, sys, csv, argparse, glob
+import os, sys, csv, argparse
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
 import pandas as pd
 
 # ===== 路径与窗口设置 =====
@@ -45,17 +52,36 @@ def parse_years(spec: str):
 def in_bbox(lat, lon, bbox):
     return (bbox["lat_min"] <= lat <= bbox["lat_max"]) and (bbox["lon_min"] <= lon <= bbox["lon_max"])
 
+# 表头行 -> (LATITUDE 列号, LONGITUDE 列号)；GSOD 各文件表头相同，基本只解析一次
+_LATLON_COLS = {}
+
 def read_first_latlon(csv_path):
-    # 仅取头一行，且只读两列，加速
+    # 仅读表头与首行（csv 模块，不启动 pandas 解析器）
     try:
-        df = pd.read_csv(csv_path, nrows=1, usecols=["LATITUDE","LONGITUDE"])
-        if df.empty: return None
-        lat = float(df.iloc[0]["LATITUDE"])
-        lon = float(df.iloc[0]["LONGITUDE"])
-        return lat, lon
-    except Exception:
+        with open(csv_path, "r", newline="", encoding="utf-8", errors="ignore") as f:
+            header_line = f.readline()
+            cols = _LATLON_COLS.get(header_line)
+            if cols is None:
+                header = next(csv.reader([header_line]))
+                cols = (header.index("LATITUDE"), header.index("LONGITUDE"))
+                _LATLON_COLS[header_line] = cols
+            row = next(csv.reader(f), None)
+        if not row: return None
+        return float(row[cols[0]]), float(row[cols[1]])
+    except (OSError, StopIteration, ValueError, IndexError):
         return None
 
+def _scan_one(fp, bbox):
+    """单个站点文件 -> (sid, lon, lat)；读不到坐标或不在 bbox 内返回 None（供进程池调用）"""
+    sid = os.path.splitext(os.path.basename(fp))[0]
+    latlon = read_first_latlon(fp)
+    if latlon is None:
+        return None
+    lat, lon = latlon
+    if in_bbox(lat, lon, bbox):
+        return sid, lon, lat
+    return None
+
 def find_year_dir(y: int):
     for base in GSOD_BASE_CANDIDATES:
         ydir = os.path.join(base, str(y))
@@ -63,10 +89,33 @@ def find_year_dir(y: int):
             return ydir
     return None
 
-def load_country_map(path_hint: str = None):
-    """优先尝试读取 isd-history.csv（需包含列：USAF, WBAN, CTRY），
-       组合 6位USAF + 5位WBAN 作为 GSOD 11位站号，映射到 CTRY。
-       若找不到有效文件，返回空映射。"""
+def write_parquet(df, out_csv):
+    """CSV 索引旁写同名 .parquet（zstd）；无 pyarrow 等情况只提示，不影响 CSV"""
+    out_pq = os.path.splitext(out_csv)[0] + ".parquet"
+    try:
+        df.to_parquet(out_pq, index=False, compression="zstd")
+    except Exception as e:
+        print(f"[warn] parquet not written: {out_pq}: {e}")
+
+def read_csv_cached(path):
+    """读 CSV；同目录 <path>.parquet 比源文件新时直接读 Parquet，否则解析后写缓存"""
+    cache = path + ".parquet"
+    try:
+        if os.path.getmtime(cache) > os.path.getmtime(path):
+            return pd.read_parquet(cache)
+    except Exception:
+        pass
+    df = pd.read_csv(path)
+    try:
+        df.to_parquet(cache, compression="zstd")
+    except Exception:
+        pass  # 目录只读或无 pyarrow：下次照常解析
+    return df
+
+def load_station_meta(path_hint: str = None):
+    """优先尝试读取 isd-history.csv（需包含列：USAF, WBAN, CTRY；可选 LAT, LON），
+       组合 6位USAF + 5位WBAN 作为 GSOD 11位站号，映射到 (lat, lon, ctry)。
+       坐标列缺失或为空时 lat/lon 为 None。若找不到有效文件，返回空映射。"""
     candidates = []
     if path_hint:
         candidates.append(path_hint)
@@ -79,7 +128,7 @@ def load_country_map(path_hint: str = None):
     for p in candidates:
         if p and os.path.isfile(p):
             try:
-                df = pd.read_csv(p)
+                df = read_csv_cached(p)
                 # 允许不同大小写
                 upcols = {c.upper(): c for c in df.columns}
                 if not {"USAF","WBAN","CTRY"}.issubset(upcols.keys()):
@@ -88,7 +137,15 @@ def load_country_map(path_hint: str = None):
                 wba = df[upcols["WBAN"]].astype(str).str.zfill(5)
                 sid = usa + wba
                 ctry = df[upcols["CTRY"]].astype(str)
-                return dict(zip(sid, ctry))
+                if {"LAT","LON"}.issubset(upcols.keys()):
+                    lat = pd.to_numeric(df[upcols["LAT"]], errors="coerce")
+                    lon = pd.to_numeric(df[upcols["LON"]], errors="coerce")
+                    ok = lat.notna() & lon.notna()
+                    lat = lat.astype(object).where(ok, None)
+                    lon = lon.astype(object).where(ok, None)
+                else:
+                    lat = lon = [None] * len(df)
+                return dict(zip(sid, zip(lat, lon, ctry)))
             except Exception:
                 continue
     return {}
@@ -100,16 +157,31 @@ def main():
                     help="lon_min lon_max lat_min lat_max（默认与既有脚本一致）")
     ap.add_argument("--country-map", default=None,
                     help="可选：自定义站点→国家映射CSV路径（两列：station_id,country）")
+    ap.add_argument("--workers", type=int, default=None, help="扫描进程数（默认 CPU 核数）")
+    ap.add_argument("--serial", action="store_true", help="单进程顺序扫描（调试用）")
+    ap.add_argument("--file-coords", action="store_true",
+                    help="坐标一律读各站 CSV 首行（默认优先用 isd-history 的 LAT/LON）")
+    ap.add_argument("--to-parquet", action="store_true",
+                    help="仅把已有的 gsod_index_<year>.csv 转为 Parquet 后退出")
     args = ap.parse_args()
 
+    if args.to_parquet:
+        for y in parse_years(args.years):
+            out_csv = os.path.join(OUT_DIR, f"gsod_index_{y}.csv")
+            if os.path.isfile(out_csv):
+                df = pd.read_csv(out_csv, dtype={"station_id": str, "country": str}, keep_default_na=False)
+                write_parquet(df, out_csv)
+        return
+
     bbox = DEFAULT_BBOX if args.bbox is None else dict(
         lon_min=args.bbox[0], lon_max=args.bbox[1], lat_min=args.bbox[2], lat_max=args.bbox[3]
     )
     years = parse_years(args.years)
     ensure_dir(OUT_DIR)
 
-    # 先尝试自动加载 ISD 历史表
-    country_map = load_country_map()
+    # 先尝试自动加载 ISD 历史表（站号 -> 坐标/国家，只读一次）
+    station_meta = load_station_meta()
+    country_map = {sid: ctry for sid, (_, _, ctry) in station_meta.items()}
 
     # 若用户显式提供自定义映射，则覆盖
     if args.country_map:
@@ -122,31 +194,47 @@ def main():
         except Exception as e:
             print(f"[warn] --country-map 读取失败：{e}")
 
+    country_ser = pd.Series(country_map, dtype=object)
+
+    # 每年上万个小文件：打开+解析首行互不相关，用进程池并行
+    pool = None if args.serial else ProcessPoolExecutor(max_workers=args.workers)
+    scan = partial(_scan_one, bbox=bbox)
+
     for y in years:
         ydir = find_year_dir(y)
         if not ydir:
             print(f"[warn] missing folder for year {y} under {GSOD_BASE_CANDIDATES}")
             continue
 
-        rows = []
         # 每个站一个 CSV，文件名即 11 位站号，如 03075099999.csv
-        for fp in glob.glob(os.path.join(ydir, "*.csv")):
+        with os.scandir(ydir) as it:
+            files = [e.path for e in it
+                     if e.name.endswith(".csv") and not e.name.startswith(".")]
+
+        # 历史表里有坐标的站直接判 bbox；其余才打开文件读首行
+        found, to_read = [], []
+        for fp in files:
             sid = os.path.splitext(os.path.basename(fp))[0]
-            latlon = read_first_latlon(fp)
-            if latlon is None:
-                continue
-            lat, lon = latlon
-            if in_bbox(lat, lon, bbox):
-                cc = country_map.get(sid, "")
-                rows.append((sid, lon, lat, cc))
+            lat, lon, _ = station_meta.get(sid, (None, None, ""))
+            if lat is None or args.file_coords:
+                to_read.append(fp)
+            elif in_bbox(lat, lon, bbox):
+                found.append((sid, lon, lat))
+        hits = pool.map(scan, to_read, chunksize=64) if pool else map(scan, to_read)
+        found.extend(filter(None, hits))
+
+        # 国家代码整列 map 查表，DataFrame 一次写出
+        df = pd.DataFrame(found, columns=["station_id","lon","lat"])
+        df["country"] = df["station_id"].map(country_ser).fillna("")
 
         out_csv = os.path.join(OUT_DIR, f"gsod_index_{y}.csv")
-        with open(out_csv, "w", newline="", encoding="utf-8") as fw:
-            w = csv.writer(fw)
-            w.writerow(["station_id","lon","lat","country"])
-            w.writerows(rows)
+        df.to_csv(out_csv, index=False)
+        write_parquet(df, out_csv)
+
+        print(f"[index] {y}: kept {len(df)} stations in bbox -> {out_csv}")
 
-        print(f"[index] {y}: kept {len(rows)} stations in bbox -> {out_csv}")
+    if pool:
+        pool.shutdown()
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,29 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, sys, math, argparse, glob
+import os, sys, math, argparse, json, csv
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import geopandas as gpd
-from shapely.geometry import Point
+import shapely
+import shapely.wkb
 import pandas as pd
 import matplotlib.pyplot as plt
+from matplotlib.path import Path
+from matplotlib.collections import PathCollection
+
+# 矢量读取引擎：优先 pyogrio（整层向量化读取，可走 Arrow），否则退回 fiona
+try:
+    import pyogrio  # noqa: F401
+    _READ_KW = {"engine": "pyogrio"}
+    try:
+        import pyarrow  # noqa: F401
+        _READ_KW["use_arrow"] = True
+    except ImportError:
+        pass
+except ImportError:
+    _READ_KW = {}
 
 # ===== 路径与窗口设置（保持你原有输出路径不变） =====
 GSOD_BASE = os.path.expanduser("~/yangtze-1998-wrfhydro-rri/data/gsod/extracted")
@@ -28,8 +44,13 @@ YANGTZE_TRIB_LAYER = "yangtze_major_tribs"
 NE_LAND_SHP = "/data/geodata/natural_earth/ne_50m_land/ne_50m_land.shp"
 NE_COUNTRY_SHP = "/data/geodata/natural_earth/ne_50m_admin_0_countries/ne_50m_admin_0_countries.shp"
 
+# —— 底图缓存（裁剪 + WGS84 后的 GeoParquet；源文件更新后自动失效）——
+BASE_CACHE_DIR = os.path.expanduser("~/.cache/gsod_baselayers")
+
 # —— 绘图样式（与你原脚本一致）——
-DPI = 300
+DPI = 200          # 屏幕/对比用默认值；出版级可 --dpi 300
+# PNG 编码参数（Pillow optimize：多花编码时间换更小文件，不影响像素）
+PNG_PIL_KWARGS = {"optimize": True}
 LAND_FC = "#f0efe8"
 LAND_EC = "#c6c3b6"
 COUNTRY_EC = "#8b8b8b"
@@ -46,55 +67,151 @@ TRIB_LW = 1.2
 STATION_MS = 16
 STATION_ALPHA = 0.9
 
+# 无索引回退时并发读各站首行的线程数（打开小文件为主，I/O 等待占大头）
+READ_WORKERS = 32
+
 # 面板年份与标签
 PANEL_YEARS = [1931, 1935, 1954, 1998]
 PANEL_TAGS  = ["(a) 1931", "(b) 1935", "(c) 1954", "(d) 1998"]
 
 def ensure_dir(p): os.makedirs(p, exist_ok=True)
 
+def list_csvs(d):
+    """目录下的 *.csv（不含隐藏文件）；scandir 一次遍历，DirEntry 自带类型信息，不逐个 stat"""
+    with os.scandir(d) as it:
+        return [e.path for e in it
+                if e.name.endswith(".csv") and not e.name.startswith(".") and e.is_file()]
+
 # ===== 底图缓存 =====
+def _bbox_tuple(bbox):
+    """BBOX dict -> (minx, miny, maxx, maxy)"""
+    return (bbox["lon_min"], bbox["lat_min"], bbox["lon_max"], bbox["lat_max"])
+
+def _read_file(path, bbox=None, **kwargs):
+    """
+    gpd.read_file 包装：按 _READ_KW 选择引擎；Arrow 读取失败（如 GDAL < 3.6）时退回普通读取。
+    bbox=(minx, miny, maxx, maxy) 下推到 GDAL 空间过滤，只读与窗口相交的要素（整要素保留，不裁剪）；
+    驱动不支持时读全量后用 .cx 筛选。
+    """
+    if bbox is not None:
+        try:
+            return gpd.read_file(path, **_READ_KW, bbox=bbox, **kwargs)
+        except Exception:
+            return _read_file(path, **kwargs).cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+    try:
+        return gpd.read_file(path, **_READ_KW, **kwargs)
+    except Exception:
+        if not _READ_KW.get("use_arrow"):
+            raise
+        return gpd.read_file(path, engine=_READ_KW["engine"], **kwargs)
+
+# shapefile 的几何与属性分存在同名各组件里（改 .dbf 属性不会动 .shp 的 mtime）
+_SHP_PARTS = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+def _source_mtime(path):
+    """矢量源的最新修改时间：shapefile 取各组件的最大值，其他格式（gpkg）取文件本身"""
+    stem, ext = os.path.splitext(path)
+    if ext.lower() != ".shp":
+        return os.path.getmtime(path)
+    return max(os.path.getmtime(stem + e) for e in _SHP_PARTS if os.path.exists(stem + e))
+
 class BaseLayers:
     def __init__(self):
         self.land=self.country=self.basin=self.main=self.trib=None
         self.china_poly=None  # 供空间回退判断
     def load(self):
+        # 只读与研究窗口相交的要素；中国整体与窗口相交，china_poly 不受影响
+        bb = _bbox_tuple(BBOX)
         if os.path.exists(NE_LAND_SHP):
-            self.land = gpd.read_file(NE_LAND_SHP); self.land = self._to_wgs84(self.land)
+            self.land = _read_file(NE_LAND_SHP, bbox=bb); self.land = self._to_wgs84(self.land)
         else:
             print(f"[warn] land shp not found: {NE_LAND_SHP}")
         if os.path.exists(NE_COUNTRY_SHP):
-            self.country = gpd.read_file(NE_COUNTRY_SHP); self.country = self._to_wgs84(self.country)
+            self.country = _read_file(NE_COUNTRY_SHP, bbox=bb); self.country = self._to_wgs84(self.country)
             # 构造中国多边形（ADM0_A3=CHN 优先，其次 NAME/NAME_EN = China）
             try:
                 cols = {c.lower(): c for c in self.country.columns}
                 poly = None
-                if "adm0_a3" in cols:
-                    cand = self.country[self.country[cols["adm0_a3"]].astype(str).str.upper().eq("CHN")]
-                    if not cand.empty: poly = cand.union_all()
-                if poly is None:
-                    for key in ["name_en", "name"]:
-                        if key in cols:
-                            cand = self.country[self.country[cols[key]].astype(str).str.upper().eq("CHINA")]
-                            if not cand.empty: poly = cand.union_all(); break
+                # 候选列依次尝试：(列名, 目标值)；列本身即字符串，直接 .str.upper() 比较，不整列 astype(str)
+                for key, want in [("adm0_a3", "CHN"), ("name_en", "CHINA"), ("name", "CHINA")]:
+                    col = cols.get(key)
+                    if col is None: continue
+                    cand = self.country[self.country[col].str.upper() == want]
+                    # Natural Earth 每国一行（多部件即 MultiPolygon）：单行直接取几何，免去 GEOS 合并
+                    if len(cand) == 1: poly = cand.geometry.iloc[0]; break
+                    if not cand.empty: poly = cand.union_all(); break
+                if poly is not None:
+                    # 0.01° 远小于站距；简化后顶点数大减，prepare 建内部索引供反复点查
+                    poly = poly.simplify(0.01, preserve_topology=True)
+                    shapely.prepare(poly)
                 self.china_poly = poly
             except Exception as e:
                 print(f"[warn] build china polygon failed: {e}")
         else:
             print(f"[warn] country shp not found: {NE_COUNTRY_SHP}")
         if os.path.exists(YANGTZE_BASIN_UNION_SHP):
-            self.basin = gpd.read_file(YANGTZE_BASIN_UNION_SHP); self.basin = self._to_wgs84(self.basin)
+            self.basin = _read_file(YANGTZE_BASIN_UNION_SHP, bbox=bb); self.basin = self._to_wgs84(self.basin)
         if os.path.exists(YANGTZE_MAIN_GPKG):
             try:
-                self.main = gpd.read_file(YANGTZE_MAIN_GPKG, layer=YANGTZE_MAIN_LAYER)
+                self.main = _read_file(YANGTZE_MAIN_GPKG, layer=YANGTZE_MAIN_LAYER, bbox=bb)
                 self.main = self._to_wgs84(self.main)
             except Exception as e:
                 print(f"[warn] load mainstem failed: {e}")
         if os.path.exists(YANGTZE_TRIB_GPKG):
             try:
-                self.trib = gpd.read_file(YANGTZE_TRIB_GPKG, layer=YANGTZE_TRIB_LAYER)
+                self.trib = _read_file(YANGTZE_TRIB_GPKG, layer=YANGTZE_TRIB_LAYER, bbox=bb)
                 self.trib = self._to_wgs84(self.trib)
             except Exception as e:
                 print(f"[warn] load tribs failed: {e}")
+    # 图层属性名 -> 源文件
+    def _sources(self):
+        return {"land": NE_LAND_SHP, "country": NE_COUNTRY_SHP, "basin": YANGTZE_BASIN_UNION_SHP,
+                "main": YANGTZE_MAIN_GPKG, "trib": YANGTZE_TRIB_GPKG}
+    def load_cached(self, refresh=False):
+        """优先读 GeoParquet 缓存（按 BBOX 分目录）；缺失/过期则 load() 后写缓存"""
+        cdir = os.path.join(BASE_CACHE_DIR, "_".join(f"{v:g}" for v in _bbox_tuple(BBOX)))
+        if not refresh and self._read_cache(cdir):
+            return
+        self.load()
+        self._write_cache(cdir)
+    def _read_cache(self, cdir):
+        stamp = os.path.join(cdir, "layers.json")
+        try:
+            t = os.path.getmtime(stamp)
+            with open(stamp, encoding="utf-8") as f:
+                names = set(json.load(f))
+            present = {k for k, p in self._sources().items() if os.path.exists(p)}
+            # 源文件增减或比缓存新 → 失效
+            if names != present or any(_source_mtime(self._sources()[k]) >= t for k in present):
+                return False
+            # bbox 借助 covering 列（每行外包框）在 Arrow 层先筛行组，只解码与窗口相交的几何
+            bb = _bbox_tuple(BBOX)
+            for k in names:
+                setattr(self, k, gpd.read_parquet(os.path.join(cdir, f"{k}.parquet"), bbox=bb))
+            wkb = os.path.join(cdir, "china_poly.wkb")
+            if os.path.exists(wkb):
+                with open(wkb, "rb") as f:
+                    self.china_poly = shapely.wkb.loads(f.read())
+                shapely.prepare(self.china_poly)
+            return True
+        except Exception:
+            self.__init__()
+            return False
+    def _write_cache(self, cdir):
+        try:
+            ensure_dir(cdir)
+            names = [k for k in self._sources() if getattr(self, k) is not None]
+            for k in names:
+                getattr(self, k).to_parquet(os.path.join(cdir, f"{k}.parquet"),
+                                            geometry_encoding="WKB", write_covering_bbox=True)
+            if self.china_poly is not None:
+                with open(os.path.join(cdir, "china_poly.wkb"), "wb") as f:
+                    f.write(shapely.wkb.dumps(self.china_poly))
+            # 最后写 stamp：只有完整写完的缓存才会被采用
+            with open(os.path.join(cdir, "layers.json"), "w", encoding="utf-8") as f:
+                json.dump(names, f)
+        except Exception as e:
+            print(f"[warn] base layer cache not written: {e}")
     @staticmethod
     def _to_wgs84(gdf):
         try:
@@ -129,72 +246,120 @@ def _setup_panel_axes(ax, bbox, show_left_labels, show_bottom_labels):
         ax.spines[s].set_color("black")
         ax.spines[s].set_linewidth(0.8)
 
+def _fast_poly(ax, gdf, **kwargs):
+    """
+    面图层 → 单个 PathCollection（每个多边形一条复合路径：外环 + 内环/洞）。
+    跳过 GeoDataFrame.plot 的逐行 Patch 构造；多部件先用 shapely.get_parts 拆开。
+    """
+    paths = []
+    for poly in shapely.get_parts(gdf.geometry.values):
+        if poly.is_empty or poly.geom_type != "Polygon":
+            continue
+        rings = [poly.exterior, *poly.interiors]
+        paths.append(Path.make_compound_path(*[Path(np.asarray(r.coords)[:, :2], closed=True) for r in rings]))
+    ax.add_collection(PathCollection(paths, **kwargs), autolim=False)
+
 def _plot_baselayers(ax):
+    # 底图各层按位图输出（矢量后端里不再逐段写路径）；站点保持矢量
     if BASE.land is not None and not BASE.land.empty:
-        BASE.land.plot(ax=ax, facecolor=LAND_FC, edgecolor=LAND_EC, linewidth=0.4, zorder=0)
+        _fast_poly(ax, BASE.land, facecolor=LAND_FC, edgecolor=LAND_EC, linewidth=0.4, zorder=0, rasterized=True)
     if BASE.country is not None and not BASE.country.empty:
-        BASE.country.plot(ax=ax, facecolor="none", edgecolor=COUNTRY_EC, linewidth=COUNTRY_LW, zorder=1)
+        _fast_poly(ax, BASE.country, facecolor="none", edgecolor=COUNTRY_EC, linewidth=COUNTRY_LW, zorder=1, rasterized=True)
     if BASE.basin is not None and not BASE.basin.empty:
-        BASE.basin.boundary.plot(ax=ax, color=BASIN_EC, linewidth=BASIN_LW, zorder=2)
+        BASE.basin.boundary.plot(ax=ax, color=BASIN_EC, linewidth=BASIN_LW, zorder=2, rasterized=True)
     if BASE.main is not None and not BASE.main.empty:
-        BASE.main.plot(ax=ax, color=MAIN_EC, linewidth=MAIN_LW, zorder=3)
+        BASE.main.plot(ax=ax, color=MAIN_EC, linewidth=MAIN_LW, zorder=3, rasterized=True)
     if BASE.trib is not None and not BASE.trib.empty:
-        BASE.trib.plot(ax=ax, color=TRIB_EC, linewidth=TRIB_LW, zorder=3)
+        BASE.trib.plot(ax=ax, color=TRIB_EC, linewidth=TRIB_LW, zorder=3, rasterized=True)
 
-def _plot_points(ax, pts_lonlat):
-    if not pts_lonlat: return
-    gdf_pts = gpd.GeoDataFrame(geometry=[Point(x, y) for x, y in pts_lonlat], crs="EPSG:4326")
-    gdf_pts.plot(ax=ax, marker="o", color=STATION_FC, markersize=STATION_MS, alpha=STATION_ALPHA, zorder=4)
+def _plot_points(ax, xy):
+    """xy: (n, 2) 经纬度数组；直接 scatter，不构造 Point / GeoDataFrame"""
+    if not len(xy): return
+    ax.scatter(xy[:, 0], xy[:, 1], marker="o", color=STATION_FC, s=STATION_MS, alpha=STATION_ALPHA, zorder=4)
 
 # ===== 读取“全部”或“中国子集”的年站点 =====
-def load_points_for_year(y: int, bbox: dict, china_only: bool, china_codes=("CHN","CH")):
+def read_year_index(y: int, bbox: dict):
+    """读该年索引并做 BBOX 约束；优先 Parquet（过滤条件下推，行组统计直接跳过窗口外数据），
+       其次 CSV。两者都没有返回 None。"""
+    base = os.path.join(INDEX_DIR, f"gsod_index_{y}")
+    if os.path.exists(base + ".parquet"):
+        try:
+            return pd.read_parquet(base + ".parquet", filters=[
+                ("lon", ">=", bbox["lon_min"]), ("lon", "<=", bbox["lon_max"]),
+                ("lat", ">=", bbox["lat_min"]), ("lat", "<=", bbox["lat_max"])])
+        except Exception:
+            pass  # 无 pyarrow 等 → 读 CSV
+    if os.path.exists(base + ".csv"):
+        df = pd.read_csv(base + ".csv")
+        # query 在装有 numexpr 时把四个比较融合成一次遍历
+        return df.query("lon >= @bbox['lon_min'] and lon <= @bbox['lon_max'] and "
+                        "lat >= @bbox['lat_min'] and lat <= @bbox['lat_max']")
+    return None
+
+# 表头行 -> (LONGITUDE 列号, LATITUDE 列号)；GSOD 各文件表头相同，基本只解析一次
+_LONLAT_COLS = {}
+
+def read_first_latlon(fp):
+    """站点 CSV 首条记录的 (lon, lat)；读不到返回 None（csv 模块只读表头与首行）"""
+    try:
+        with open(fp, "r", newline="", encoding="utf-8-sig", errors="ignore") as f:
+            header_line = f.readline()
+            cols = _LONLAT_COLS.get(header_line)
+            if cols is None:
+                header = next(csv.reader([header_line]))
+                cols = _LONLAT_COLS[header_line] = (header.index("LONGITUDE"), header.index("LATITUDE"))
+            row = next(csv.reader(f), None)
+        if not row: return None
+        return float(row[cols[0]]), float(row[cols[1]])
+    except Exception:
+        return None
+
+def load_points_for_year(y: int, bbox: dict, china_codes=("CHN","CH")):
+    """返回 (全部站点, 中国站点) 两个 (n, 2) 经纬度数组；该年索引/目录只读一次，两个子集都由它派生"""
     # 优先用索引（更快、可用country列）
-    index_csv = os.path.join(INDEX_DIR, f"gsod_index_{y}.csv")
-    pts = []
-    if os.path.exists(index_csv):
+    df = None
+    try:
+        df = read_year_index(y, bbox)
+    except Exception:
+        pass
+    if df is not None:
         try:
-            df = pd.read_csv(index_csv)
-            # 先做 BBOX 约束
-            df = df[(df["lon"]>=bbox["lon_min"]) & (df["lon"]<=bbox["lon_max"]) &
-                    (df["lat"]>=bbox["lat_min"]) & (df["lat"]<=bbox["lat_max"])]
-            if not china_only:
-                return list(zip(df["lon"], df["lat"]))
+            pts_all = df[["lon", "lat"]].to_numpy(dtype=float)
             # 只取中国
             if "country" in df.columns:
                 cc = {c.upper() for c in china_codes}
                 dfc = df[df["country"].astype(str).str.upper().isin(cc)]
-                return list(zip(dfc["lon"], dfc["lat"]))
-            # 无 country 列 → 空间回退
-            if BASE.china_poly is not None and not df.empty:
-                g = gpd.GeoDataFrame(df.copy(), geometry=gpd.points_from_xy(df["lon"], df["lat"]), crs="EPSG:4326")
-                g["in_china"] = g.geometry.apply(lambda p: BASE.china_poly.contains(p))
-                gc = g[g["in_china"]]
-                return list(zip(gc["lon"], gc["lat"]))
-            return []
+            # 无 country 列 → 空间回退（contains_xy 整列坐标一次判定，不逐点构造 Point）
+            elif BASE.china_poly is not None and not df.empty:
+                mask = shapely.contains_xy(BASE.china_poly, df["lon"].to_numpy(), df["lat"].to_numpy())
+                dfc = df[mask]
+            else:
+                return pts_all, np.empty((0, 2))
+            return pts_all, dfc[["lon", "lat"]].to_numpy(dtype=float)
         except Exception:
             pass
 
     # 无索引 → 扫该年目录读第一条记录拿经纬度
     year_dir = os.path.join(GSOD_BASE, str(y))
     if not os.path.isdir(year_dir):
-        return []
-    for fp in glob.glob(os.path.join(year_dir, "*.csv")):
-        try:
-            df = pd.read_csv(fp, header=0, nrows=1, usecols=["LATITUDE","LONGITUDE"])
-            if df.empty: continue
-            lat = float(df.iloc[0]["LATITUDE"]); lon = float(df.iloc[0]["LONGITUDE"])
-            if bbox["lon_min"] <= lon <= bbox["lon_max"] and bbox["lat_min"] <= lat <= bbox["lat_max"]:
-                if not china_only:
-                    pts.append((lon, lat))
-                else:
-                    if BASE.china_poly is not None and BASE.china_poly.contains(Point(lon, lat)):
-                        pts.append((lon, lat))
-        except Exception:
-            continue
-    return pts
+        return np.empty((0, 2)), np.empty((0, 2))
+    files = list_csvs(year_dir)
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as ex:
+        lonlats = list(ex.map(read_first_latlon, files))
+    xy = np.array([p for p in lonlats if p is not None], dtype=float).reshape(-1, 2)
+    xy = xy[(xy[:, 0] >= bbox["lon_min"]) & (xy[:, 0] <= bbox["lon_max"]) &
+            (xy[:, 1] >= bbox["lat_min"]) & (xy[:, 1] <= bbox["lat_max"])]
+    # 先收齐窗口内坐标，再一次性判定是否落在中国多边形内
+    if BASE.china_poly is None or not len(xy):
+        return xy, np.empty((0, 2))
+    return xy, xy[shapely.contains_xy(BASE.china_poly, xy[:, 0], xy[:, 1])]
 
 # ===== 面板绘制（复用一次生成两张：outer_nest / outer_nest_china_only） =====
-def draw_panel(points_list, title_setup, out_png):
+def build_template(dpi=DPI):
+    """
+    建 2×2 画布并画好与点集无关的部分（底图、坐标轴、图例、轴标题、边距），返回 (fig, axes)。
+    两张图共用同一模板，draw_panel 只增删站点层与面板标注。
+    """
     # 依据 BBOX 计算画布尺寸与子图间距（沿用你原策略）
     lon_span = BBOX["lon_max"] - BBOX["lon_min"]
     lat_span = BBOX["lat_max"] - BBOX["lat_min"]
@@ -210,27 +375,18 @@ def draw_panel(points_list, title_setup, out_png):
     fig, axes = plt.subplots(
         2, 2,
         figsize=(fig_width, fig_height),
-        dpi=DPI,
+        dpi=dpi,
         gridspec_kw=dict(wspace=wspace_val, hspace=hspace_val)
     )
     axes = axes.ravel()
 
-    # 逐面板绘制
+    # 逐面板底图与坐标轴
     for i, ax in enumerate(axes):
         show_left   = (i % 2 == 0)
         show_bottom = (i // 2 == 1)
         _plot_baselayers(ax)
-        _plot_points(ax, points_list[i])
         _setup_panel_axes(ax, BBOX, show_left, show_bottom)
 
-        # 计算当前面板站点数量
-        n_points = len(points_list[i])
-        panel_label = f"{PANEL_TAGS[i]}   N={n_points}"
-
-        ax.text(0.02, 0.98, panel_label,
-                transform=ax.transAxes, ha="left", va="top", fontsize=11,
-                bbox=dict(facecolor='white', edgecolor='none', alpha=0.55))
-
     # 统一图例
     from matplotlib.lines import Line2D
     handles, labels = [], []
@@ -248,36 +404,67 @@ def draw_panel(points_list, title_setup, out_png):
     fig.text(0.05, 0.5, "Latitude (°N)", va="center", ha="center", rotation="vertical", fontsize=12)
     fig.text(0.5, 0.03, "Longitude (°E)", va="center", ha="center", fontsize=12)
 
-    # 总标题（不写 BBOX，用 setup 命名）
-    fig.suptitle(f"GSOD Stations  |  setup: {title_setup}", y=0.985, fontsize=13)
-
     fig.subplots_adjust(left=0.085, right=0.96, bottom=0.075, top=0.94,
                         wspace=wspace_val, hspace=hspace_val)
+    return fig, axes
+
+def draw_panel(points_list, title_setup, out_png, template=None):
+    fig, axes = template if template is not None else build_template()
+
+    # 本张图新增的站点层与面板标注，保存后移除，模板留给下一张
+    added = []
+    for i, ax in enumerate(axes):
+        n_base = len(ax.collections)
+        _plot_points(ax, points_list[i])
+        added.extend(ax.collections[n_base:])
+
+        # 计算当前面板站点数量
+        n_points = len(points_list[i])
+        panel_label = f"{PANEL_TAGS[i]}   N={n_points}"
+
+        added.append(ax.text(0.02, 0.98, panel_label,
+                             transform=ax.transAxes, ha="left", va="top", fontsize=11,
+                             bbox=dict(facecolor='white', edgecolor='none', alpha=0.55)))
+
+    # 总标题（不写 BBOX，用 setup 命名）；重复调用时替换同一个 suptitle
+    fig.suptitle(f"GSOD Stations  |  setup: {title_setup}", y=0.985, fontsize=13)
+
     ensure_dir(os.path.dirname(out_png))
-    fig.savefig(out_png, bbox_inches="tight")
-    plt.close(fig)
+    fig.savefig(out_png, dpi=fig.dpi, bbox_inches="tight", pil_kwargs=PNG_PIL_KWARGS)
+    if template is None:
+        plt.close(fig)
+    else:
+        for art in added:
+            art.remove()
     print(f"[done] wrote figure: {out_png}")
 
 def main():
     parser = argparse.ArgumentParser(description="GSOD 2×2 yearly comparison (1931/1935/1954/1998)")
     parser.add_argument("--outdir", default=OUT_DIR, help="输出目录（默认仓库 docs/figs/gsod_comparison）")
     parser.add_argument("--china-codes", default="CHN,CH", help="country 列中国代码（逗号分隔）")
+    parser.add_argument("--refresh-cache", action="store_true", help="忽略底图缓存，重新读取矢量文件")
+    parser.add_argument("--dpi", type=int, default=DPI, help=f"输出分辨率（默认 {DPI}；出版用 300）")
     args = parser.parse_args()
 
     ensure_dir(args.outdir)
-    BASE.load()
+    BASE.load_cached(refresh=args.refresh_cache)
     china_codes = tuple(c.strip().upper() for c in args.china_codes.split(",") if c.strip())
 
     # 组装两套点集：outer_nest / outer_nest_china_only
-    points_all   = [load_points_for_year(y, BBOX, china_only=False, china_codes=china_codes) for y in PANEL_YEARS]
-    points_china = [load_points_for_year(y, BBOX, china_only=True,  china_codes=china_codes) for y in PANEL_YEARS]
+    # 每年只读一次，同时得到两套点集
+    per_year     = [load_points_for_year(y, BBOX, china_codes=china_codes) for y in PANEL_YEARS]
+    points_all   = [p_all for p_all, _ in per_year]
+    points_china = [p_cn for _, p_cn in per_year]
 
     # 输出两个文件（保持原名 + 再加一个 *_china.png）
     out_png_all   = os.path.join(args.outdir, "gsod_stations_comparison_2x2_equal.png")
     out_png_china = os.path.join(args.outdir, "gsod_stations_comparison_2x2_equal_china.png")
 
-    draw_panel(points_all,   title_setup="outer_nest",               out_png=out_png_all)
-    draw_panel(points_china, title_setup="outer_nest_china_only",    out_png=out_png_china)
+    # 底图只画一次，两张图共用
+    template = build_template(dpi=args.dpi)
+    draw_panel(points_all,   title_setup="outer_nest",               out_png=out_png_all,   template=template)
+    draw_panel(points_china, title_setup="outer_nest_china_only",    out_png=out_png_china, template=template)
+    plt.close(template[0])
 
 if __name__ == "__main__":
     main()
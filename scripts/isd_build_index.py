@@ -4,6 +4,7 @@
 """
 从 ISD 目录按年扫描站点 CSV，只读首行拿到 LAT/LON，筛到给定 BBOX 内，
 输出每年的站点索引：station_id, lon, lat, country
+并把所有年份汇总写入按 year 分区（hive 风格 year=YYYY/）的 Parquet 数据集 /data/isd/index_pq
 
 - 数据目录：优先 /data/isd/extracted/<year>/*.csv，其次 /data/isd/<year>/*.csv
 - 国家代码 country：自动从 isd-history(.csv/.txt) 解析（USAF+WBAN→CTRY），
@@ -15,15 +16,24 @@
   python isd_build_index.py --years 1950-1960 --country-map /path/to/sid_country.csv
 """
 
-import os, sys, csv, argparse, glob, re
+import os, sys, csv, argparse
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
 import pandas as pd
 
 # ===== 路径与窗口设置 =====
 OUT_DIR = os.path.expanduser("/data/isd/index")
+# 按年分区的 Parquet 数据集（读端可只取 lon/lat 列、按 year 过滤分区）
+PQ_DIR = "/data/isd/index_pq"
+INDEX_COLUMNS = ["station_id", "lon", "lat", "country"]
 ISD_BASE_CANDIDATES = ["/data/isd/extracted", "/data/isd"]
 
 DEFAULT_BBOX = dict(lon_min=85.5, lon_max=130.0, lat_min=18.0, lat_max=40.0)
 
+# 并发读首行的线程数（每年上万个小文件，耗时主要在打开文件的 I/O 等待）
+READ_WORKERS = 32
+# 按年份并行的进程数（年份之间无共享状态）
+YEAR_WORKERS = os.cpu_count() or 1
+
 def ensure_dir(p): os.makedirs(p, exist_ok=True)
 
 def parse_years(spec: str):
@@ -44,23 +54,38 @@ def in_bbox(lat, lon, bbox):
 LAT_CANDIDATES = ["LATITUDE", "LAT", "latitude", "lat"]
 LON_CANDIDATES = ["LONGITUDE", "LON", "longitude", "lon"]
 
+# 表头行 -> (纬度列号, 经度列号)；同一批文件表头基本相同，只解析一次
+_LATLON_COLS = {}
+
+def _latlon_cols(header_line):
+    cols = _LATLON_COLS.get(header_line)
+    if cols is None:
+        hmap = {h.lower(): i for i, h in enumerate(next(csv.reader([header_line])))}
+        lat_idx = next((hmap[c.lower()] for c in LAT_CANDIDATES if c.lower() in hmap), None)
+        lon_idx = next((hmap[c.lower()] for c in LON_CANDIDATES if c.lower() in hmap), None)
+        cols = _LATLON_COLS[header_line] = (lat_idx, lon_idx)
+    return cols
+
 def read_first_latlon(csv_path):
+    # 仅读表头与首行（csv 模块，不启动 pandas 解析器）
     try:
-        # 只读首行，先探测有哪些列
-        head = pd.read_csv(csv_path, nrows=1)
-        if head.empty:
+        with open(csv_path, "r", newline="", encoding="utf-8-sig", errors="ignore") as f:
+            lat_idx, lon_idx = _latlon_cols(f.readline())
+            if lat_idx is None or lon_idx is None:
+                return None
+            row = next(csv.reader(f), None)
+        if not row:
             return None
-        cols = {c.lower(): c for c in head.columns}
-        lat_col = next((cols[c.lower()] for c in LAT_CANDIDATES if c.lower() in cols), None)
-        lon_col = next((cols[c.lower()] for c in LON_CANDIDATES if c.lower() in cols), None)
-        if not lat_col or not lon_col:
-            return None
-        lat = float(head.iloc[0][lat_col])
-        lon = float(head.iloc[0][lon_col])
-        return lat, lon
+        return float(row[lat_idx]), float(row[lon_idx])
     except Exception:
         return None
 
+def list_csvs(d):
+    """目录下的 *.csv（不含隐藏文件）；scandir 一次遍历，DirEntry 自带类型信息，不逐个 stat"""
+    with os.scandir(d) as it:
+        return [e.path for e in it
+                if e.name.endswith(".csv") and not e.name.startswith(".") and e.is_file()]
+
 def find_year_dir(y: int):
     for base in ISD_BASE_CANDIDATES:
         ydir = os.path.join(base, str(y))
@@ -76,6 +101,25 @@ def normalize_sid_from_filename(fp: str):
     base = os.path.splitext(os.path.basename(fp))[0]
     return base.split("_", 1)[0]
 
+# isd-history.txt 定宽列位置（与表头 "USAF   WBAN  STATION NAME ... CTRY ST CALL" 对齐）
+ISD_HISTORY_TXT_COLSPECS = [(0, 6), (7, 12), (43, 45)]
+
+def read_isd_history_txt(p):
+    """定宽 isd-history.txt → DataFrame(USAF, WBAN, CTRY)；read_fwf 按列切片整表一次解析。
+       说明文字行数不固定（其中也有以 USAF 开头的释义行），先定位含 CTRY 的表头行。"""
+    skip = None
+    with open(p, "r", encoding="utf-8", errors="ignore") as fr:
+        for i, line in enumerate(fr):
+            if line.startswith("USAF") and "CTRY" in line:
+                skip = i + 1
+                break
+    if skip is None:
+        return None
+    df = pd.read_fwf(p, colspecs=ISD_HISTORY_TXT_COLSPECS, names=["USAF", "WBAN", "CTRY"],
+                     skiprows=skip, dtype=str, encoding="utf-8", encoding_errors="ignore")
+    # 无国家代码的站无法归属，丢弃
+    return df.dropna()
+
 def load_country_map_from_isd_history(path_hint: str = None):
     """
     解析 isd-history（.csv 或 .txt）。需要列/字段：USAF, WBAN, CTRY。
@@ -103,35 +147,75 @@ def load_country_map_from_isd_history(path_hint: str = None):
             continue
         try:
             if p.lower().endswith(".csv"):
-                df = pd.read_csv(p)
+                # 只解析需要的三列（列名大小写不敏感），按字符串读入保留前导零
+                df = pd.read_csv(p, usecols=lambda c: c.upper() in ("USAF", "WBAN", "CTRY"), dtype=str)
             else:
-                # isd-history.txt 是固定宽度/空白分隔的文本；用正则从每行提取关键字段
-                rows = []
-                with open(p, "r", encoding="utf-8", errors="ignore") as fr:
-                    for line in fr:
-                        # 粗犷匹配：USAF, WBAN, CTRY 常见为空白分隔；跳过标题/空行
-                        m = re.search(r"(^|\s)(\d{1,6})\s+(\d{1,5})\s+.*?\s([A-Z]{2})\s", line)
-                        if m:
-                            usa, wba, ctry = m.group(2), m.group(3), m.group(4)
-                            rows.append((usa, wba, ctry))
-                if not rows:
+                # isd-history.txt 是固定宽度文本
+                df = read_isd_history_txt(p)
+                if df is None or df.empty:
                     continue
-                df = pd.DataFrame(rows, columns=["USAF", "WBAN", "CTRY"])
 
             up = {c.upper(): c for c in df.columns}
             if not {"USAF", "WBAN", "CTRY"}.issubset(up.keys()):
                 continue
 
-            usa = df[up["USAF"]].astype(str).str.zfill(6)
-            wba = df[up["WBAN"]].astype(str).str.zfill(5)
-            sid = usa + wba
-            ctry = df[up["CTRY"]].astype(str)
-            return dict(zip(sid, ctry))
+            # 三列转为 Arrow 字符串（连续 UTF-8 缓冲区），zfill/拼接在 C 里完成
+            cols = [up["USAF"], up["WBAN"], up["CTRY"]]
+            try:
+                s = df[cols].astype("string[pyarrow]")
+            except ImportError:
+                s = df[cols].astype("string")
+            sid = s[up["USAF"]].str.zfill(6) + s[up["WBAN"]].str.zfill(5)
+            ctry = s[up["CTRY"]].fillna("")
+            return dict(zip(sid.to_numpy(), ctry.to_numpy()))
         except Exception:
             continue
 
     return {}
 
+def write_parquet_dataset(frames, out_dir):
+    """各年索引合并为一张表写成 year 分区数据集；本次涉及年份的旧分区先删除，其余年份保留。
+       无 pyarrow 等情况只提示，不影响 CSV。"""
+    if not frames:
+        return
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        table = pa.Table.from_pandas(pd.concat(frames, ignore_index=True), preserve_index=False)
+        ds.write_dataset(table, out_dir, format="parquet", partitioning=["year"],
+                         partitioning_flavor="hive", existing_data_behavior="delete_matching")
+        print(f"[index] parquet dataset ({len(frames)} years) -> {out_dir}")
+    except Exception as e:
+        print(f"[warn] parquet dataset not written: {out_dir}: {e}")
+
+# 子进程内只读的 station_id→country 映射，由进程池 initializer 设置一次，不随每个任务 pickle
+_COUNTRY_MAP = {}
+
+def _init_worker(country_map):
+    global _COUNTRY_MAP
+    _COUNTRY_MAP = country_map
+
+def process_year(y, bbox):
+    """扫描一年的目录 → (y, rows)；目录不存在时 rows 为 None"""
+    ydir = find_year_dir(y)
+    if not ydir:
+        return y, None
+
+    rows = []
+    # 允许文件名两种风格：46764099999.csv 或 46764099999_1931.csv
+    files = list_csvs(ydir)
+    with ThreadPoolExecutor(max_workers=READ_WORKERS) as ex:
+        latlons = list(ex.map(read_first_latlon, files))
+    for fp, latlon in zip(files, latlons):
+        sid = normalize_sid_from_filename(fp)
+        if latlon is None:
+            continue
+        lat, lon = latlon
+        if in_bbox(lat, lon, bbox):
+            cc = _COUNTRY_MAP.get(sid, "")
+            rows.append((sid, lon, lat, cc))
+    return y, rows
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--years", required=True, help="例如 1929-2025 或 1931,1954,1998")
@@ -163,31 +247,24 @@ def main():
         except Exception as e:
             print(f"[warn] --country-map 读取失败：{e}")
 
-    for y in years:
-        ydir = find_year_dir(y)
-        if not ydir:
-            print(f"[warn] missing folder for year {y} under {ISD_BASE_CANDIDATES}")
-            continue
-
-        rows = []
-        # 允许文件名两种风格：46764099999.csv 或 46764099999_1931.csv
-        for fp in glob.glob(os.path.join(ydir, "*.csv")):
-            sid = normalize_sid_from_filename(fp)
-            latlon = read_first_latlon(fp)
-            if latlon is None:
+    frames = []
+    with ProcessPoolExecutor(max_workers=min(YEAR_WORKERS, len(years)) or 1,
+                             initializer=_init_worker, initargs=(country_map,)) as ex:
+        futures = [ex.submit(process_year, y, bbox) for y in years]
+        for fut in as_completed(futures):
+            y, rows = fut.result()
+            if rows is None:
+                print(f"[warn] missing folder for year {y} under {ISD_BASE_CANDIDATES}")
                 continue
-            lat, lon = latlon
-            if in_bbox(lat, lon, bbox):
-                cc = country_map.get(sid, "")
-                rows.append((sid, lon, lat, cc))
-
-        out_csv = os.path.join(OUT_DIR, f"isd_index_{y}.csv")
-        with open(out_csv, "w", newline="", encoding="utf-8") as fw:
-            w = csv.writer(fw)
-            w.writerow(["station_id", "lon", "lat", "country"])
-            w.writerows(rows)
-
-        print(f"[index] {y}: kept {len(rows)} stations in bbox -> {out_csv}")
+
+            out_csv = os.path.join(OUT_DIR, f"isd_index_{y}.csv")
+            df = pd.DataFrame(rows, columns=INDEX_COLUMNS)
+            df.to_csv(out_csv, index=False)
+            frames.append(df.assign(year=y))
+
+            print(f"[index] {y}: kept {len(rows)} stations in bbox -> {out_csv}")
+
+    write_parquet_dataset(frames, PQ_DIR)
 
 if __name__ == "__main__":
     main()
@@ -1,13 +1,36 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import os, sys, math, argparse, glob
+import os, sys, math, argparse, glob, json
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
 import numpy as np
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point
+import shapely
+import shapely.wkb
 import matplotlib.pyplot as plt
 
+# 矢量读取引擎：优先 pyogrio（整层向量化读取，可走 Arrow），否则退回 fiona
+try:
+    import pyogrio  # noqa: F401
+    _READ_KW = {"engine": "pyogrio"}
+    try:
+        import pyarrow  # noqa: F401
+        _READ_KW["use_arrow"] = True
+    except ImportError:
+        pass
+except ImportError:
+    _READ_KW = {}
+
+# 索引 CSV 解析：优先 pyarrow.csv（多线程、只转换需要的列），否则退回 pandas
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pv
+    import pyarrow.compute as pc
+except ImportError:
+    pa = None
+
 # ========= 路径与输出 =========
 # 兼容 /data/isd/extracted/<year>/*.csv 与 /data/isd/<year>/*.csv
 ISD_BASE_CANDIDATES = ["/data/isd/extracted", "/data/isd"]
@@ -43,8 +66,11 @@ NE_COUNTRY_SHP = os.path.expanduser(
     "/data/geodata/natural_earth/ne_50m_admin_0_countries/ne_50m_admin_0_countries.shp"
 )
 
+# 底图缓存（裁剪 + WGS84 后的 GeoParquet，连同中国多边形 WKB；源文件更新后自动失效）
+BASE_CACHE_DIR = os.path.expanduser("~/.cache/isd_baselayers")
+
 # ========= 绘图样式（与 GSOD 版保持一致）=========
-DPI = 300
+DPI = 150          # 逐年预览图默认值；出版级可 --dpi 300
 LAND_FC = "#f0efe8"
 LAND_EC = "#c6c3b6"
 COUNTRY_EC = "#8b8b8b"
@@ -59,58 +85,155 @@ MAIN_LW = 1.8
 TRIB_LW = 1.2
 STATION_MS = 8
 STATION_ALPHA = 0.85
+PNG_COMPRESS_LEVEL = 3   # 默认 6；3 体积略大但编码约快一倍，像素不变
+MAP_WORKERS = os.cpu_count() or 1   # 逐年出图的进程数（Agg 渲染吃 CPU，进程间互不影响）
+INDEX_WORKERS = 8                   # 逐年索引预读的线程数（I/O 为主，与 CPU 数无关）
 
 def ensure_dir(p): os.makedirs(p, exist_ok=True)
 
 # ========= 底图缓存，与 GSOD 版一致 =========
+def _bbox_tuple(bbox):
+    """BBOX dict -> (minx, miny, maxx, maxy)"""
+    return (bbox["lon_min"], bbox["lat_min"], bbox["lon_max"], bbox["lat_max"])
+
+def _read_file(path, bbox=None, **kwargs):
+    """
+    gpd.read_file 包装：按 _READ_KW 选择引擎；Arrow 读取失败（如 GDAL < 3.6）时退回普通读取。
+    bbox=(minx, miny, maxx, maxy) 下推到 GDAL 空间过滤，只读与窗口相交的要素（整要素保留，不裁剪）；
+    驱动不支持时读全量后用 .cx 筛选。
+    """
+    if bbox is not None:
+        try:
+            return gpd.read_file(path, **_READ_KW, bbox=bbox, **kwargs)
+        except Exception:
+            return _read_file(path, **kwargs).cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+    try:
+        return gpd.read_file(path, **_READ_KW, **kwargs)
+    except Exception:
+        if not _READ_KW.get("use_arrow"):
+            raise
+        return gpd.read_file(path, engine=_READ_KW["engine"], **kwargs)
+
+# shapefile 的几何与属性分存在同名各组件里（改 .dbf 属性不会动 .shp 的 mtime）
+_SHP_PARTS = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+def _source_mtime(path):
+    """矢量源的最新修改时间：shapefile 取各组件的最大值，其他格式（gpkg）取文件本身"""
+    stem, ext = os.path.splitext(path)
+    if ext.lower() != ".shp":
+        return os.path.getmtime(path)
+    return max(os.path.getmtime(stem + e) for e in _SHP_PARTS if os.path.exists(stem + e))
+
 class BaseLayers:
     def __init__(self):
         self.land=None; self.country=None; self.basin=None; self.main=None; self.trib=None
         self.china_poly=None  # 供空间回退判断使用
 
-    def load(self):
+    def load(self, bbox=None):
+        # 只读与研究窗口相交的要素；中国整体与窗口相交，china_poly 不受影响
+        bb = _bbox_tuple(bbox or BBOX)
         if os.path.exists(NE_LAND_SHP):
-            self.land = gpd.read_file(NE_LAND_SHP); self.land = self._to_wgs84(self.land)
+            self.land = _read_file(NE_LAND_SHP, bbox=bb); self.land = self._to_wgs84(self.land)
         else:
             print(f"[warn] land shp not found: {NE_LAND_SHP}")
 
         if os.path.exists(NE_COUNTRY_SHP):
-            self.country = gpd.read_file(NE_COUNTRY_SHP); self.country = self._to_wgs84(self.country)
-            # 预取中国多边形：优先 ADM0_A3 == "CHN"，回退到 NAME/NAME_EN == "China"
-            try:
-                cols = {c.lower(): c for c in self.country.columns}
-                poly = None
-                if "adm0_a3" in cols:
-                    cand = self.country[self.country[cols["adm0_a3"]].astype(str).str.upper().eq("CHN")]
-                    if not cand.empty: poly = cand.union_all()
-                if poly is None:
-                    for key in ["name_en", "name"]:
-                        if key in cols:
-                            cand = self.country[self.country[cols[key]].astype(str).str.upper().eq("CHINA")]
-                            if not cand.empty: poly = cand.union_all(); break
-                self.china_poly = poly
-            except Exception as e:
-                print(f"[warn] build china polygon failed: {e}")
+            self.country = _read_file(NE_COUNTRY_SHP, bbox=bb); self.country = self._to_wgs84(self.country)
+            self.china_poly = self._build_china_poly()
+            if self.china_poly is not None:
+                # prepare 建内部索引，供 contains_xy 反复点查
+                shapely.prepare(self.china_poly)
         else:
             print(f"[warn] country shp not found: {NE_COUNTRY_SHP}")
 
         if YANGTZE_BASIN_UNION_SHP and os.path.exists(YANGTZE_BASIN_UNION_SHP):
-            self.basin = gpd.read_file(YANGTZE_BASIN_UNION_SHP); self.basin = self._to_wgs84(self.basin)
+            self.basin = _read_file(YANGTZE_BASIN_UNION_SHP, bbox=bb); self.basin = self._to_wgs84(self.basin)
 
         if YANGTZE_MAIN_GPKG and os.path.exists(YANGTZE_MAIN_GPKG):
             try:
-                self.main = gpd.read_file(YANGTZE_MAIN_GPKG, layer=YANGTZE_MAIN_LAYER)
+                self.main = _read_file(YANGTZE_MAIN_GPKG, layer=YANGTZE_MAIN_LAYER, bbox=bb)
                 self.main = self._to_wgs84(self.main)
             except Exception as e:
                 print(f"[warn] load mainstem failed: {e}")
 
         if YANGTZE_TRIB_GPKG and os.path.exists(YANGTZE_TRIB_GPKG):
             try:
-                self.trib = gpd.read_file(YANGTZE_TRIB_GPKG, layer=YANGTZE_TRIB_LAYER)
+                self.trib = _read_file(YANGTZE_TRIB_GPKG, layer=YANGTZE_TRIB_LAYER, bbox=bb)
                 self.trib = self._to_wgs84(self.trib)
             except Exception as e:
                 print(f"[warn] load tribs failed: {e}")
 
+    def _build_china_poly(self):
+        # 预取中国多边形：优先 ADM0_A3 == "CHN"，回退到 NAME/NAME_EN == "China"
+        try:
+            cols = {c.lower(): c for c in self.country.columns}
+            poly = None
+            if "adm0_a3" in cols:
+                cand = self.country[self.country[cols["adm0_a3"]].astype(str).str.upper().eq("CHN")]
+                if not cand.empty: poly = cand.union_all()
+            if poly is None:
+                for key in ["name_en", "name"]:
+                    if key in cols:
+                        cand = self.country[self.country[cols[key]].astype(str).str.upper().eq("CHINA")]
+                        if not cand.empty: poly = cand.union_all(); break
+            return poly
+        except Exception as e:
+            print(f"[warn] build china polygon failed: {e}")
+            return None
+
+    # 图层属性名 -> 源文件
+    def _sources(self):
+        return {"land": NE_LAND_SHP, "country": NE_COUNTRY_SHP, "basin": YANGTZE_BASIN_UNION_SHP,
+                "main": YANGTZE_MAIN_GPKG, "trib": YANGTZE_TRIB_GPKG}
+
+    def load_cached(self, bbox=None, refresh=False):
+        """优先读 GeoParquet 缓存（按 BBOX 分目录）；缺失/过期则 load() 后写缓存"""
+        bb = _bbox_tuple(bbox or BBOX)
+        cdir = os.path.join(BASE_CACHE_DIR, "_".join(f"{v:g}" for v in bb))
+        if not refresh and self._read_cache(cdir, bb):
+            return
+        self.load(bbox)
+        self._write_cache(cdir)
+
+    def _read_cache(self, cdir, bb):
+        stamp = os.path.join(cdir, "layers.json")
+        try:
+            t = os.path.getmtime(stamp)
+            with open(stamp, encoding="utf-8") as f:
+                names = set(json.load(f))
+            present = {k for k, p in self._sources().items() if p and os.path.exists(p)}
+            # 源文件增减或比缓存新（shapefile 看全部组件）→ 失效
+            if names != present or any(_source_mtime(self._sources()[k]) >= t for k in present):
+                return False
+            # bbox 借助 covering 列（每行外包框）在 Arrow 层先筛行组，只解码与窗口相交的几何
+            for k in names:
+                setattr(self, k, gpd.read_parquet(os.path.join(cdir, f"{k}.parquet"), bbox=bb))
+            wkb = os.path.join(cdir, "china_poly.wkb")
+            if os.path.exists(wkb):
+                with open(wkb, "rb") as f:
+                    self.china_poly = shapely.wkb.loads(f.read())
+                shapely.prepare(self.china_poly)
+            return True
+        except Exception:
+            self.__init__()
+            return False
+
+    def _write_cache(self, cdir):
+        try:
+            ensure_dir(cdir)
+            names = [k for k in self._sources() if getattr(self, k) is not None]
+            for k in names:
+                getattr(self, k).to_parquet(os.path.join(cdir, f"{k}.parquet"),
+                                            geometry_encoding="WKB", write_covering_bbox=True)
+            if self.china_poly is not None:
+                with open(os.path.join(cdir, "china_poly.wkb"), "wb") as f:
+                    f.write(shapely.wkb.dumps(self.china_poly))
+            # 最后写 stamp：只有完整写完的缓存才会被采用
+            with open(os.path.join(cdir, "layers.json"), "w", encoding="utf-8") as f:
+                json.dump(names, f)
+        except Exception as e:
+            print(f"[warn] base layer cache not written: {e}")
+
     @staticmethod
     def _to_wgs84(gdf):
         try:
@@ -123,25 +246,33 @@ class BaseLayers:
 BASE = BaseLayers()
 
 # ========= 坐标轴风格（与 GSOD 版一致）=========
+@lru_cache(maxsize=None)
 def _nice_step(span):
     raw = span / 6.0
     candidates = [0.25, 0.5, 1, 2, 2.5, 5]
     return min(candidates, key=lambda c: abs(c - raw))
 
+@lru_cache(maxsize=None)
+def _axis_ticks(lo, hi):
+    """[lo, hi] 内的整齐刻度；BBOX 固定，整个脚本每个轴只算一次（数组只读使用）"""
+    return np.arange(math.ceil(lo), math.floor(hi)+1e-6, _nice_step(hi - lo))
+
 def _setup_axes(ax, bbox):
     ax.set_xlim(bbox["lon_min"], bbox["lon_max"])
     ax.set_ylim(bbox["lat_min"], bbox["lat_max"])
     ax.set_aspect("equal", adjustable="box")
-    lon_span = bbox["lon_max"] - bbox["lon_min"]
-    lat_span = bbox["lat_max"] - bbox["lat_min"]
-    ax.set_xticks(np.arange(math.ceil(bbox["lon_min"]), math.floor(bbox["lon_max"])+1e-6, _nice_step(lon_span)))
-    ax.set_yticks(np.arange(math.ceil(bbox["lat_min"]), math.floor(bbox["lat_max"])+1e-6, _nice_step(lat_span)))
+    ax.set_xticks(_axis_ticks(bbox["lon_min"], bbox["lon_max"]))
+    ax.set_yticks(_axis_ticks(bbox["lat_min"], bbox["lat_max"]))
     ax.set_xlabel("Longitude (°E)")
     ax.set_ylabel("Latitude (°N)")
 
-def draw_map(year, pts_lonlat, out_png, bbox, subtitle=None):
-    ensure_dir(os.path.dirname(out_png))
-    fig, ax = plt.subplots(figsize=FIGSIZE, dpi=DPI)
+def build_base_figure(bbox, title_lines=2, dpi=DPI):
+    """
+    画好与年份无关的部分（底图、坐标轴、布局），返回 (fig, ax, sc)；sc 为空的站点散点层。
+    逐年的 draw_map 只替换站点坐标、标题与图例，底图整个脚本只画一次。
+    title_lines: 标题行数，tight_layout 按同样高度的占位标题留边。
+    """
+    fig, ax = plt.subplots(figsize=FIGSIZE, dpi=dpi)
 
     if BASE.land is not None and not BASE.land.empty:
         BASE.land.plot(ax=ax, facecolor=LAND_FC, edgecolor=LAND_EC, linewidth=0.4, zorder=0)
@@ -154,19 +285,31 @@ def draw_map(year, pts_lonlat, out_png, bbox, subtitle=None):
     if BASE.trib is not None and not BASE.trib.empty:
         BASE.trib.plot(ax=ax, color=TRIB_EC, linewidth=TRIB_LW, zorder=3)
 
-    if pts_lonlat:
-        gdf_pts = gpd.GeoDataFrame(geometry=[Point(x,y) for x,y in pts_lonlat], crs="EPSG:4326")
-        gdf_pts.plot(ax=ax, marker="o", color=STATION_FC, markersize=STATION_MS, alpha=STATION_ALPHA, zorder=4)
-
     _setup_axes(ax, bbox)
+    ax.set_title("\n".join(["ISD Stations"] * title_lines))
+    plt.tight_layout()
+    # 站点层只建一次，逐年 set_offsets 换坐标；坐标范围已固定，不触发 autoscale
+    sc = ax.scatter(np.empty(0), np.empty(0), marker="o", color=STATION_FC, s=STATION_MS,
+                    alpha=STATION_ALPHA, zorder=4, rasterized=True)
+    return fig, ax, sc
+
+def draw_map(year, pts_lonlat, out_png, bbox, subtitle=None, base=None):
+    """base: build_base_figure 的 (fig, ax, sc)；给出时复用：站点层换坐标，图例保存后移除"""
+    ensure_dir(os.path.dirname(out_png))
     title = f"ISD Stations — {year}"
     if subtitle:
         title += f"\n{subtitle}"
+    fig, ax, sc = base if base is not None else build_base_figure(bbox, title.count("\n") + 1)
+
+    # 经纬度坐标轴上直接换散点坐标，不构造 Point / GeoDataFrame，也不新建图层
+    sc.set_offsets(np.asarray(pts_lonlat, dtype=float).reshape(-1, 2))
+    added = []
+
     ax.set_title(title)
 
     from matplotlib.lines import Line2D
     handles, labels = [], []
-    if pts_lonlat:
+    if len(pts_lonlat):
         handles.append(Line2D([], [], marker='o', color='none',
                               markerfacecolor=STATION_FC, markersize=STATION_MS/1.6))
         labels.append("ISD Station")
@@ -177,11 +320,30 @@ def draw_map(year, pts_lonlat, out_png, bbox, subtitle=None):
     if BASE.basin is not None and not BASE.basin.empty:
         handles.append(Line2D([], [], color=BASIN_EC, linewidth=BASIN_LW)); labels.append("Yangtze basin boundary")
     if handles:
-        ax.legend(handles, labels, loc="upper right", frameon=True, framealpha=0.9)
-
-    plt.tight_layout()
-    fig.savefig(out_png, bbox_inches="tight")
-    plt.close(fig)
+        added.append(ax.legend(handles, labels, loc="upper right", frameon=True, framealpha=0.9))
+
+    fig.savefig(out_png, dpi=fig.dpi, bbox_inches="tight", pil_kwargs={"compress_level": PNG_COMPRESS_LEVEL})
+    if base is None:
+        plt.close(fig)
+    else:
+        for art in added:
+            art.remove()
+
+# ========= 多进程出图 =========
+_WORKER_BASE = None  # 子进程内复用的 (fig, ax, sc)
+
+def _init_map_worker(base_layers, bbox, title_lines, dpi):
+    """子进程初始化：接收主进程已读好的底图图层，并在本进程画一次底图"""
+    global BASE, _WORKER_BASE
+    BASE = base_layers
+    _WORKER_BASE = build_base_figure(bbox, title_lines, dpi)
+
+def draw_year_worker(task):
+    """task = (year, pts_all, pts_china, out_all, out_china, bbox)
+       同一年的两张图在同一进程里依次叠加到同一张底图上，无需两次调度与两份底图"""
+    y, pts_all, pts_ch, out_all, out_china, bbox = task
+    draw_map(y, pts_all, out_all,   bbox, f"BBOX stations (N={len(pts_all)})", base=_WORKER_BASE)
+    draw_map(y, pts_ch,  out_china, bbox, f"BBOX ∩ China (N={len(pts_ch)})",   base=_WORKER_BASE)
 
 # ========= 数据加载 =========
 def find_year_dir(y: int):
@@ -191,34 +353,48 @@ def find_year_dir(y: int):
             return ydir
     return None
 
+INDEX_COLUMNS = ("lon", "lat", "country")
+
+def read_index_csv(f, bbox):
+    """读一年的索引 CSV，只取 lon/lat/country 三列并做 BBOX 约束，返回 DataFrame（可能缺 country 列）。
+       有 pyarrow 时列投影与 BBOX 过滤都在 Arrow 里完成，转 pandas 的只是窗口内的行。"""
+    with open(f, "r", encoding="utf-8-sig") as fh:
+        header = fh.readline().strip().split(",")
+    cols = [c for c in INDEX_COLUMNS if c in header]
+    if pa is None:
+        df = pd.read_csv(f, usecols=cols)
+        return df[(df["lon"]>=bbox["lon_min"]) & (df["lon"]<=bbox["lon_max"]) &
+                  (df["lat"]>=bbox["lat_min"]) & (df["lat"]<=bbox["lat_max"])]
+    types = {"lon": pa.float64(), "lat": pa.float64(), "country": pa.string()}
+    tbl = pv.read_csv(f, convert_options=pv.ConvertOptions(
+        include_columns=cols, column_types={c: types[c] for c in cols}))
+    lon, lat = tbl["lon"], tbl["lat"]
+    mask = pc.and_(pc.and_(pc.greater_equal(lon, bbox["lon_min"]), pc.less_equal(lon, bbox["lon_max"])),
+                   pc.and_(pc.greater_equal(lat, bbox["lat_min"]), pc.less_equal(lat, bbox["lat_max"])))
+    return tbl.filter(mask).to_pandas()
+
 def load_points_from_index(y, bbox, china_codes):
     """优先用 ISD 索引（station_id, lon, lat, country）。
-       返回：(bbox内所有点, bbox∩中国点) —— 都是 [(lon,lat), ...] 列表。"""
+       返回：(bbox内所有点, bbox∩中国点) —— 都是 (n, 2) 的 [lon, lat] 数组。"""
     f = os.path.join(INDEX_DIR, f"isd_index_{y}.csv")
-    pts_all, pts_china = [], []
+    pts_all, pts_china = np.empty((0, 2)), np.empty((0, 2))
     if os.path.exists(f):
-        df = pd.read_csv(f)
+        df = read_index_csv(f, bbox)
         has_country = "country" in df.columns
-        # 先做 BBOX 收敛
-        df = df[(df["lon"]>=bbox["lon_min"]) & (df["lon"]<=bbox["lon_max"]) &
-                (df["lat"]>=bbox["lat_min"]) & (df["lat"]<=bbox["lat_max"])]
-        pts_all = list(zip(df["lon"].tolist(), df["lat"].tolist()))
+        pts_all = df[["lon", "lat"]].to_numpy(dtype=float)
         if has_country:
             dfc = df[df["country"].astype(str).str.upper().isin(china_codes)]
-            pts_china = list(zip(dfc["lon"].tolist(), dfc["lat"].tolist()))
+            pts_china = dfc[["lon", "lat"]].to_numpy(dtype=float)
             return pts_all, pts_china
-        # 无 country 列则空间回退
-        if BASE.china_poly is not None and not df.empty:
-            g = gpd.GeoDataFrame(df.copy(), geometry=gpd.points_from_xy(df["lon"], df["lat"]), crs="EPSG:4326")
-            g["in_china"] = g.geometry.apply(lambda p: BASE.china_poly.contains(p))
-            gc = g[g["in_china"]]
-            pts_china = list(zip(gc["lon"].tolist(), gc["lat"].tolist()))
+        # 无 country 列则空间回退（contains_xy 整列坐标一次判定，不逐点构造 Point）
+        if BASE.china_poly is not None and len(pts_all):
+            pts_china = pts_all[shapely.contains_xy(BASE.china_poly, pts_all[:, 0], pts_all[:, 1])]
         return pts_all, pts_china
 
     # 无索引时退化：扫目录读首行
     ydir = find_year_dir(y)
     if not ydir:
-        return [], []
+        return pts_all, pts_china
     ll_all = []
     for fp in glob.glob(os.path.join(ydir, "*.csv")):
         try:
@@ -237,12 +413,9 @@ def load_points_from_index(y, bbox, china_codes):
         except Exception:
             continue
     # 退化路径下无法用国家码，尝试空间回退
-    pts_all = ll_all
-    pts_china = []
-    if BASE.china_poly is not None and ll_all:
-        for (x,y) in ll_all:
-            if BASE.china_poly.contains(Point(x,y)):
-                pts_china.append((x,y))
+    pts_all = np.array(ll_all, dtype=float).reshape(-1, 2)
+    if BASE.china_poly is not None and len(pts_all):
+        pts_china = pts_all[shapely.contains_xy(BASE.china_poly, pts_all[:, 0], pts_all[:, 1])]
     return pts_all, pts_china
 
 def parse_years(spec: str):
@@ -262,6 +435,8 @@ def main():
                     help="lon_min lon_max lat_min lat_max（默认与既有脚本一致）")
     ap.add_argument("--china-codes", default="CHN,CH,CN",
                     help="与索引country列匹配的中国国家码，逗号分隔；默认兼容 CHN/CH/CN")
+    ap.add_argument("--dpi", type=int, default=DPI, help=f"输出分辨率（默认 {DPI}；出版用 300）")
+    ap.add_argument("--refresh-cache", action="store_true", help="忽略底图缓存，重新读取矢量文件")
     args = ap.parse_args()
 
     bbox = BBOX if args.bbox is None else dict(
@@ -272,7 +447,7 @@ def main():
 
     # 预载底图
     ensure_dir(OUT_DIR)
-    BASE.load()
+    BASE.load_cached(bbox, refresh=args.refresh_cache)
 
     # 输出统计（与 GSOD 版文件名对应但前缀改为 isd）
     count_all_txt   = os.path.join(OUT_DIR, "yearly_counts_isd_bbox.txt")
@@ -287,18 +462,28 @@ def main():
         fa.write("# year  n_stations_bbox\n")
         fc.write("# year  n_stations_bbox_china\n")
 
-        for y in years:
-            pts_all, pts_ch = load_points_from_index(y, bbox, china_codes)
-            fa.write(f"{y} {len(pts_all)}\n")
-            fc.write(f"{y} {len(pts_ch)}\n")
+        # 各年地图交给进程池（每年一个任务，全部/中国两张图一起画）；每个进程只画一次底图，之后逐年只叠加站点
+        ex = ProcessPoolExecutor(max_workers=max(1, min(MAP_WORKERS, len(years))),
+                                 initializer=_init_map_worker, initargs=(BASE, bbox, 2, args.dpi))
+        futures = []
+
+        # 各年索引读取以 I/O 为主，交给线程池并发预读；map 按年份顺序产出，计数文件顺序不变
+        with ThreadPoolExecutor(max_workers=INDEX_WORKERS) as io:
+            loaded = io.map(lambda y: load_points_from_index(y, bbox, china_codes), years)
+            for y, (pts_all, pts_ch) in zip(years, loaded):
+                fa.write(f"{y} {len(pts_all)}\n")
+                fc.write(f"{y} {len(pts_ch)}\n")
+
+                out_all   = os.path.join(fig_dir_all,   f"stations_{y}.png")
+                out_china = os.path.join(fig_dir_china, f"stations_{y}_china.png")
 
-            out_all   = os.path.join(fig_dir_all,   f"stations_{y}.png")
-            out_china = os.path.join(fig_dir_china, f"stations_{y}_china.png")
+                futures.append(ex.submit(draw_year_worker, (y, pts_all, pts_ch, out_all, out_china, bbox)))
 
-            draw_map(y, pts_all, out_all, bbox, subtitle=f"BBOX stations (N={len(pts_all)})")
-            draw_map(y, pts_ch,  out_china, bbox, subtitle=f"BBOX ∩ China (N={len(pts_ch)})")
+                print(f"[map] {y}: bbox={len(pts_all)} -> {out_all} ; china={len(pts_ch)} -> {out_china}")
 
-            print(f"[map] {y}: bbox={len(pts_all)} -> {out_all} ; china={len(pts_ch)} -> {out_china}")
+        with ex:
+            for fut in futures:
+                fut.result()  # 子进程异常在此抛出
 
     print(f"[done] wrote counts: {count_all_txt} , {count_china_txt}")
 
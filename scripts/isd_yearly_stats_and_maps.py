@@ -2,16 +2,31 @@
 # -*- coding: utf-8 -*-
 
 import os
-import re
 import sys
 import math
-from collections import defaultdict, OrderedDict
+import json
+import argparse
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 
 import numpy as np
+import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point
 import matplotlib.pyplot as plt
 
+# 矢量读取引擎：优先 pyogrio（整层向量化读取，可走 Arrow），否则退回 fiona
+try:
+    import pyogrio  # noqa: F401
+    _READ_KW = {"engine": "pyogrio"}
+    try:
+        import pyarrow  # noqa: F401
+        _READ_KW["use_arrow"] = True
+    except ImportError:
+        pass
+except ImportError:
+    _READ_KW = {}
+
 # ========= 可配置区域（与 ghcnd 脚本保持一致的风格与底图） =========
 BASE_DIR = os.path.expanduser("~/yangtze-1998-wrfhydro-rri/data/isd")
 META_DIR = os.path.join(BASE_DIR, "metadata")
@@ -25,9 +40,10 @@ BBOX = dict(lon_min=85.5, lon_max=130.0, lat_min=18.0, lat_max=40.0)
 CHINA_CODES = {"CH", "HK", "MC", "TW", "CN"}  # ISD 历史表 CTRY=FIPS / WMO，常见为"CH"；冗余包含 CN 等
 
 # 两个输出 setup：大窗口全部站点；仅中国站点（国家码判定）
+# filter_fn 接收按列存放的站表（lat/lon/ctry 各为一列数组），返回整列布尔掩码
 SETUPS = OrderedDict({
-    "isd_big_window": dict(filter_fn=lambda rec: in_bbox(rec["lat"], rec["lon"], BBOX)),
-    "isd_big_window_china_only": dict(filter_fn=lambda rec: in_bbox(rec["lat"], rec["lon"], BBOX) and (rec.get("ctry") in CHINA_CODES)),
+    "isd_big_window": dict(filter_fn=lambda st: in_bbox(st["lat"], st["lon"], BBOX)),
+    "isd_big_window_china_only": dict(filter_fn=lambda st: in_bbox(st["lat"], st["lon"], BBOX) & np.isin(st["ctry"], sorted(CHINA_CODES))),
 })
 
 # —— 叠加用地理图层（路径与 ghcnd 保持一致）——
@@ -51,8 +67,11 @@ NE_COUNTRY_SHP = os.path.expanduser(
     "~/yangtze-1998-wrfhydro-rri/data/geodata/natural_earth/ne_50m_admin_0_countries/ne_50m_admin_0_countries.shp"
 )
 
+# —— 底图缓存（裁剪 + WGS84 后的 GeoParquet；源文件更新后自动失效）——
+BASE_CACHE_DIR = os.path.expanduser("~/.cache/isd_stats_baselayers")
+
 # —— 绘图样式（与 ghcnd 同款）——
-DPI = 300
+DPI = 150          # 逐年预览图默认值；出版级可 --dpi 300
 LAND_FC = "#f0efe8"
 LAND_EC = "#c6c3b6"
 COUNTRY_EC = "#8b8b8b"
@@ -67,6 +86,8 @@ MAIN_LW = 1.8
 TRIB_LW = 1.2
 STATION_MS = 8
 STATION_ALPHA = 0.85
+PNG_COMPRESS_LEVEL = 3   # 默认 6；3 体积略大但编码约快一倍，像素不变
+MAP_WORKERS = os.cpu_count() or 1   # 逐年出图的进程数（Agg 渲染吃 CPU，进程间互不影响）
 
 MIN_YEAR, MAX_YEAR = 1901, 2025  # 与数据档期对齐
 
@@ -76,97 +97,120 @@ def ensure_dir(p):
     os.makedirs(p, exist_ok=True)
 
 def in_bbox(lat, lon, bbox):
-    return (bbox["lat_min"] <= lat <= bbox["lat_max"]) and (bbox["lon_min"] <= lon <= bbox["lon_max"])
+    """标量返回 bool；传入 numpy 数组时返回整列布尔掩码（一次向量化比较）"""
+    return ((lat >= bbox["lat_min"]) & (lat <= bbox["lat_max"])
+            & (lon >= bbox["lon_min"]) & (lon <= bbox["lon_max"]))
 
+@lru_cache(maxsize=None)
 def _nice_step(span):
     raw = span / 6.0  # 目标 ~5–7 tick
     candidates = [0.25, 0.5, 1, 2, 2.5, 5]
     return min(candidates, key=lambda c: abs(c - raw))
 
+@lru_cache(maxsize=None)
+def _axis_ticks(lo, hi):
+    """[lo, hi] 内的整齐刻度；BBOX 固定，整个脚本每个轴只算一次（数组只读使用）"""
+    return np.arange(math.ceil(lo), math.floor(hi) + 1e-6, _nice_step(hi - lo))
+
 # ========= 读 isd-history（取坐标/国家/起止日期） =========
+# isd-history.txt 定宽列位置（与表头 "USAF   WBAN  STATION NAME ... CTRY ST CALL  LAT     LON      ELEV(M) BEGIN    END" 对齐）
+ISD_HISTORY_COLSPECS = [(0, 6), (7, 12), (43, 45), (57, 64), (65, 73), (82, 90), (91, 99)]
+ISD_HISTORY_NAMES = ["usaf", "wban", "ctry", "lat", "lon", "begin", "end"]
+
+def _header_skiprows(path, prefix="USAF", must_have=None):
+    """说明文字行数不固定：返回表头行之后的行号（表头以 prefix 开头、且含 must_have），找不到返回 0"""
+    with open(path, "r", encoding="utf-8", errors="ignore") as fr:
+        for i, line in enumerate(fr):
+            if line.startswith(prefix) and (must_have is None or must_have in line):
+                return i + 1
+    return 0
+
 def parse_isd_history(path):
     """
-    返回 dict:
-      sid -> { 'lat': float, 'lon': float, 'ctry': str, 'begin': int(YYYYMMDD), 'end': int(YYYYMMDD) }
+    返回 (sid_to_idx, stations)：
+      sid_to_idx: "USAF-WBAN" -> 行号（int），站号在此一次性转成整数 id；
+      stations:   按列存放的站表 { 'lat', 'lon': float 数组, 'ctry': str 数组,
+                  'begin', 'end': int(YYYYMMDD) 数组 }，第 i 行即 id 为 i 的站。
     行示例与列含义见文件头（USAF, WBAN, CTRY, LAT, LON, BEGIN, END 等）。
+    定宽文件，read_fwf 按列位置整表一次解析；缺经纬度或起止日期的站丢弃。
     """
-    sid2meta = {}
-    # 允许 header/空行，允许缺失字段（用正则宽松抽取）
-    pat = re.compile(
-        r'^\s*(?P<usaf>\S+)\s+(?P<wban>\S+)\s+(?P<rest>.*)$'
-    )
-
-    # 尝试从尾部字段抽取经纬度/高程/起止日期
-    tail_pat = re.compile(
-        r'(?P<lat>[+-]?\d+(?:\.\d+)?)\s+(?P<lon>[+-]?\d+(?:\.\d+)?)\s+(?P<elev>[+-]?\d+(?:\.\d+)?)?\s+(?P<begin>\d{8})\s+(?P<end>\d{8})\s*$'
-    )
-
-    with open(path, "r", encoding="utf-8", errors="ignore") as fr:
-        for line in fr:
-            if not line.strip():
-                continue
-            if line.lstrip().startswith(("*", "USAF", "Integrated", "Notes:", "CTRY", "WBAN")):
-                # 跳过说明/标题
-                continue
-            m = pat.match(line)
-            if not m:
-                continue
-            usaf = m.group("usaf")
-            wban = m.group("wban")
-            rest = m.group("rest")
-
-            # 国家码通常在“站名  CTRY ST CALL LAT LON ELEV BEGIN END”的 CTRY 列
-            # 为简单起见，从 rest 中尽量抓取 CTRY 的两位/两到三位大写字符串（在经纬度之前）
-            # 先用尾部经纬度/日期定位，再在其之前找 CTRY
-            m2 = tail_pat.search(rest)
-            if not m2:
-                continue
-            lat = float(m2.group("lat"))
-            lon = float(m2.group("lon"))
-            begin = int(m2.group("begin"))
-            end = int(m2.group("end"))
-
-            head = rest[:m2.start()].rstrip()
-            # CTRY 通常靠近尾部，尝试在 head 末端找两到三位大写字母
-            m_ctry = re.search(r'([A-Z]{2,3})\s*$', head)
-            ctry = m_ctry.group(1) if m_ctry else ""
-
-            sid = f"{usaf}-{wban}"
-            sid2meta[sid] = dict(lat=lat, lon=lon, ctry=ctry, begin=begin, end=end)
-    return sid2meta
+    df = pd.read_fwf(path, colspecs=ISD_HISTORY_COLSPECS, names=ISD_HISTORY_NAMES,
+                     skiprows=_header_skiprows(path, must_have="CTRY"),
+                     dtype={"usaf": str, "wban": str, "ctry": str},
+                     encoding="utf-8", encoding_errors="ignore")
+    for c in ["lat", "lon", "begin", "end"]:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+    df = df.dropna(subset=["usaf", "wban", "lat", "lon", "begin", "end"])
+    df["ctry"] = df["ctry"].fillna("")
+    df = df.astype({"begin": "int64", "end": "int64"})
+
+    # 同一站号重复出现时以最后一行为准
+    df = df.assign(sid=df["usaf"] + "-" + df["wban"]).drop_duplicates("sid", keep="last")
+    sid_to_idx = {sid: i for i, sid in enumerate(df["sid"])}
+    stations = {c: df[c].to_numpy() for c in ["lat", "lon", "ctry", "begin", "end"]}
+    return sid_to_idx, stations
 
 # ========= 读 isd-inventory（判断每年活跃） =========
-def parse_isd_inventory(path):
+def parse_isd_inventory(path, sid_to_idx):
     """
-    返回:
-      yearly_active: dict[year] -> set(sid)
+    返回 (year0, year_offsets, sid_idx)，CSR 式按年分段：
+      sid_idx: 活跃站行号（int32，对应 sid_to_idx；不在站表里的站丢弃），按年排序；
+      y 年活跃站 = sid_idx[year_offsets[y - year0] : year_offsets[y - year0 + 1]]。
     定义：某站-年的 12 个月份计数求和 >0 则该年“活跃”。
+    空白分隔，read_csv（C 引擎）整表解析。
     """
-    yearly_active = defaultdict(set)
-    with open(path, "r", encoding="utf-8", errors="ignore") as fr:
-        for line in fr:
-            line = line.strip()
-            if not line or line.startswith(("*", "USAF")):
-                continue
-            parts = line.split()
-            if len(parts) < 15:
-                continue
-            usaf, wban, y = parts[0], parts[1], parts[2]
-            try:
-                year = int(y)
-            except ValueError:
-                continue
-            # 剩下 12 列是每月计数
-            try:
-                months = [int(v) for v in parts[3:3+12]]
-            except Exception:
-                continue
-            if sum(months) > 0:
-                sid = f"{usaf}-{wban}"
-                yearly_active[year].add(sid)
-    return yearly_active
+    cols = ["usaf", "wban", "year"] + [f"m{i:02d}" for i in range(1, 13)]
+    df = pd.read_csv(path, sep=r"\s+", header=None, names=cols, usecols=range(15),
+                     skiprows=_header_skiprows(path), dtype={"usaf": str, "wban": str},
+                     on_bad_lines="skip", engine="c", encoding_errors="ignore")
+    year = pd.to_numeric(df["year"], errors="coerce")
+    months = df[cols[3:]].apply(pd.to_numeric, errors="coerce")
+    ok = year.notna() & months.notna().all(axis=1) & (months.sum(axis=1) > 0)
+
+    idx = (df["usaf"] + "-" + df["wban"])[ok].map(sid_to_idx)
+    act = pd.DataFrame({"year": year[ok], "idx": idx}).dropna().astype("int64")
+    act = act.drop_duplicates().sort_values(["year", "idx"])
+    years = act["year"].to_numpy()
+    sid_idx = act["idx"].to_numpy(dtype=np.int32)
+    if not len(years):
+        return 0, np.zeros(1, dtype=np.int64), sid_idx
+    year0 = int(years[0])
+    year_offsets = np.searchsorted(years, np.arange(year0, int(years[-1]) + 2))
+    return year0, year_offsets, sid_idx
 
 # ========= 底图缓存 =========
+def _bbox_tuple(bbox):
+    """BBOX dict -> (minx, miny, maxx, maxy)"""
+    return (bbox["lon_min"], bbox["lat_min"], bbox["lon_max"], bbox["lat_max"])
+
+def _read_file(path, bbox=None, **kwargs):
+    """
+    gpd.read_file 包装：按 _READ_KW 选择引擎；Arrow 读取失败（如 GDAL < 3.6）时退回普通读取。
+    bbox=(minx, miny, maxx, maxy) 下推到 GDAL 空间过滤，只读与窗口相交的要素（整要素保留，不裁剪）；
+    驱动不支持时读全量后用 .cx 筛选。
+    """
+    if bbox is not None:
+        try:
+            return gpd.read_file(path, **_READ_KW, bbox=bbox, **kwargs)
+        except Exception:
+            return _read_file(path, **kwargs).cx[bbox[0]:bbox[2], bbox[1]:bbox[3]]
+    try:
+        return gpd.read_file(path, **_READ_KW, **kwargs)
+    except Exception:
+        if not _READ_KW.get("use_arrow"):
+            raise
+        return gpd.read_file(path, engine=_READ_KW["engine"], **kwargs)
+
+# shapefile 的几何与属性分存在同名各组件里（改 .dbf 属性不会动 .shp 的 mtime）
+_SHP_PARTS = (".shp", ".shx", ".dbf", ".prj", ".cpg")
+
+def _source_mtime(path):
+    """矢量源的最新修改时间：shapefile 取各组件的最大值，其他格式（gpkg）取文件本身"""
+    stem, ext = os.path.splitext(path)
+    if ext.lower() != ".shp":
+        return os.path.getmtime(path)
+    return max(os.path.getmtime(stem + e) for e in _SHP_PARTS if os.path.exists(stem + e))
+
 class BaseLayers:
     def __init__(self):
         self.land = None
@@ -175,29 +219,76 @@ class BaseLayers:
         self.main = None
         self.trib = None
 
-    def load(self):
+    def load(self, bbox=None):
+        # 只读与研究窗口相交的要素
+        bb = _bbox_tuple(bbox or BBOX)
         if os.path.exists(NE_LAND_SHP):
-            self.land = gpd.read_file(NE_LAND_SHP)
+            self.land = _read_file(NE_LAND_SHP, bbox=bb)
             self.land = self._to_wgs84(self.land)
         if os.path.exists(NE_COUNTRY_SHP):
-            self.country = gpd.read_file(NE_COUNTRY_SHP)
+            self.country = _read_file(NE_COUNTRY_SHP, bbox=bb)
             self.country = self._to_wgs84(self.country)
         if YANGTZE_BASIN_UNION_SHP and os.path.exists(YANGTZE_BASIN_UNION_SHP):
-            self.basin = gpd.read_file(YANGTZE_BASIN_UNION_SHP)
+            self.basin = _read_file(YANGTZE_BASIN_UNION_SHP, bbox=bb)
             self.basin = self._to_wgs84(self.basin)
         if YANGTZE_MAIN_GPKG and os.path.exists(YANGTZE_MAIN_GPKG):
             try:
-                self.main = gpd.read_file(YANGTZE_MAIN_GPKG, layer=YANGTZE_MAIN_LAYER)
+                self.main = _read_file(YANGTZE_MAIN_GPKG, layer=YANGTZE_MAIN_LAYER, bbox=bb)
                 self.main = self._to_wgs84(self.main)
             except Exception:
                 pass
         if YANGTZE_TRIB_GPKG and os.path.exists(YANGTZE_TRIB_GPKG):
             try:
-                self.trib = gpd.read_file(YANGTZE_TRIB_GPKG, layer=YANGTZE_TRIB_LAYER)
+                self.trib = _read_file(YANGTZE_TRIB_GPKG, layer=YANGTZE_TRIB_LAYER, bbox=bb)
                 self.trib = self._to_wgs84(self.trib)
             except Exception:
                 pass
 
+    # 图层属性名 -> 源文件
+    def _sources(self):
+        return {"land": NE_LAND_SHP, "country": NE_COUNTRY_SHP, "basin": YANGTZE_BASIN_UNION_SHP,
+                "main": YANGTZE_MAIN_GPKG, "trib": YANGTZE_TRIB_GPKG}
+
+    def load_cached(self, bbox=None, refresh=False):
+        """优先读 GeoParquet 缓存（按 BBOX 分目录）；缺失/过期则 load() 后写缓存"""
+        bb = _bbox_tuple(bbox or BBOX)
+        cdir = os.path.join(BASE_CACHE_DIR, "_".join(f"{v:g}" for v in bb))
+        if not refresh and self._read_cache(cdir, bb):
+            return
+        self.load(bbox)
+        self._write_cache(cdir)
+
+    def _read_cache(self, cdir, bb):
+        stamp = os.path.join(cdir, "layers.json")
+        try:
+            t = os.path.getmtime(stamp)
+            with open(stamp, encoding="utf-8") as f:
+                names = set(json.load(f))
+            present = {k for k, p in self._sources().items() if p and os.path.exists(p)}
+            # 源文件增减或比缓存新（shapefile 看全部组件）→ 失效
+            if names != present or any(_source_mtime(self._sources()[k]) >= t for k in present):
+                return False
+            # bbox 借助 covering 列（每行外包框）在 Arrow 层先筛行组，只解码与窗口相交的几何
+            for k in names:
+                setattr(self, k, gpd.read_parquet(os.path.join(cdir, f"{k}.parquet"), bbox=bb))
+            return True
+        except Exception:
+            self.__init__()
+            return False
+
+    def _write_cache(self, cdir):
+        try:
+            ensure_dir(cdir)
+            names = [k for k in self._sources() if getattr(self, k) is not None]
+            for k in names:
+                getattr(self, k).to_parquet(os.path.join(cdir, f"{k}.parquet"),
+                                            geometry_encoding="WKB", write_covering_bbox=True)
+            # 最后写 stamp：只有完整写完的缓存才会被采用
+            with open(os.path.join(cdir, "layers.json"), "w", encoding="utf-8") as f:
+                json.dump(names, f)
+        except Exception as e:
+            print(f"[warn] base layer cache not written: {e}")
+
     @staticmethod
     def _to_wgs84(gdf):
         try:
@@ -216,16 +307,17 @@ def _setup_axes(ax, bbox):
     ax.set_xlim(bbox["lon_min"], bbox["lon_max"])
     ax.set_ylim(bbox["lat_min"], bbox["lat_max"])
     ax.set_aspect("equal", adjustable="box")
-    lon_span = bbox["lon_max"] - bbox["lon_min"]
-    lat_span = bbox["lat_max"] - bbox["lat_min"]
-    ax.set_xticks(np.arange(math.ceil(bbox["lon_min"]), math.floor(bbox["lon_max"]) + 1e-6, _nice_step(lon_span)))
-    ax.set_yticks(np.arange(math.ceil(bbox["lat_min"]), math.floor(bbox["lat_max"]) + 1e-6, _nice_step(lat_span)))
+    ax.set_xticks(_axis_ticks(bbox["lon_min"], bbox["lon_max"]))
+    ax.set_yticks(_axis_ticks(bbox["lat_min"], bbox["lat_max"]))
     ax.set_xlabel("Longitude (°E)")
     ax.set_ylabel("Latitude (°N)")
 
-def draw_map(year, pts_lonlat, out_png, bbox, setup_label="ISD Station"):
-    ensure_dir(os.path.dirname(out_png))
-    fig, ax = plt.subplots(figsize=FIGSIZE, dpi=DPI)
+def build_base_figure(bbox, dpi=DPI):
+    """
+    画好与年份无关的部分（底图、坐标轴、布局），返回 (fig, ax, sc)；sc 为空的站点散点层。
+    逐年的 draw_map 只替换站点坐标、标题与图例，底图整个脚本只画一次。
+    """
+    fig, ax = plt.subplots(figsize=FIGSIZE, dpi=dpi)
 
     if BASE.land is not None and not BASE.land.empty:
         BASE.land.plot(ax=ax, facecolor=LAND_FC, edgecolor=LAND_EC, linewidth=0.4, zorder=0)
@@ -238,17 +330,30 @@ def draw_map(year, pts_lonlat, out_png, bbox, setup_label="ISD Station"):
     if BASE.trib is not None and not BASE.trib.empty:
         BASE.trib.plot(ax=ax, color=TRIB_EC, linewidth=TRIB_LW, zorder=3)
 
-    if pts_lonlat:
-        gpd.GeoDataFrame(geometry=[Point(x, y) for x, y in pts_lonlat], crs="EPSG:4326") \
-            .plot(ax=ax, marker="o", color=STATION_FC, markersize=STATION_MS, alpha=STATION_ALPHA, zorder=4)
-
     _setup_axes(ax, bbox)
+    # 占位标题（单行，与逐年标题同高），tight_layout 据此留边
+    ax.set_title("ISD Stations")
+    plt.tight_layout()
+    # 站点层只建一次，逐年 set_offsets 换坐标；坐标范围已固定，不触发 autoscale
+    sc = ax.scatter(np.empty(0), np.empty(0), marker="o", color=STATION_FC, s=STATION_MS,
+                    alpha=STATION_ALPHA, zorder=4, rasterized=True)
+    return fig, ax, sc
+
+def draw_map(year, pts_lonlat, out_png, bbox, setup_label="ISD Station", base=None):
+    """base: build_base_figure 的 (fig, ax, sc)；给出时复用：站点层换坐标，图例保存后移除"""
+    ensure_dir(os.path.dirname(out_png))
+    fig, ax, sc = base if base is not None else build_base_figure(bbox)
+
+    # 经纬度坐标轴上直接换散点坐标，不构造 Point / GeoDataFrame，也不新建图层
+    sc.set_offsets(np.asarray(pts_lonlat, dtype=float).reshape(-1, 2))
+    added = []
+
     ax.set_title(f"ISD Stations — {year}")
 
     from matplotlib.lines import Line2D
     handles = []
     labels = []
-    if pts_lonlat:
+    if len(pts_lonlat):
         handles.append(Line2D([], [], marker='o', color='none', markerfacecolor=STATION_FC, markersize=STATION_MS/1.6))
         labels.append(setup_label)
     if BASE.main is not None and not BASE.main.empty:
@@ -258,16 +363,37 @@ def draw_map(year, pts_lonlat, out_png, bbox, setup_label="ISD Station"):
     if BASE.basin is not None and not BASE.basin.empty:
         handles.append(Line2D([], [], color=BASIN_EC, linewidth=BASIN_LW)); labels.append("Yangtze basin boundary")
     if handles:
-        ax.legend(handles, labels, loc="upper right", frameon=True, framealpha=0.9)
+        added.append(ax.legend(handles, labels, loc="upper right", frameon=True, framealpha=0.9))
 
-    plt.tight_layout()
-    fig.savefig(out_png, bbox_inches="tight")
-    plt.close(fig)
+    fig.savefig(out_png, dpi=fig.dpi, bbox_inches="tight", pil_kwargs={"compress_level": PNG_COMPRESS_LEVEL})
+    if base is None:
+        plt.close(fig)
+    else:
+        for art in added:
+            art.remove()
+
+# ========= 多进程出图 =========
+_WORKER_BASE = None  # 子进程内复用的 (fig, ax, sc)
+
+def _init_map_worker(base_layers, bbox, dpi):
+    """子进程初始化：接收主进程已读好的底图图层，并在本进程画一次底图"""
+    global BASE, _WORKER_BASE
+    BASE = base_layers
+    _WORKER_BASE = build_base_figure(bbox, dpi)
+
+def draw_map_worker(task):
+    """task = (year, pts_lonlat, out_png, bbox, setup_label)"""
+    draw_map(*task, base=_WORKER_BASE)
 
 # ========= 主流程 =========
 def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--dpi", type=int, default=DPI, help=f"输出分辨率（默认 {DPI}；出版用 300）")
+    ap.add_argument("--refresh-cache", action="store_true", help="忽略底图缓存，重新读取矢量文件")
+    args = ap.parse_args()
+
     # 预加载底图
-    BASE.load()
+    BASE.load_cached(refresh=args.refresh_cache)
 
     if not os.path.exists(HISTORY_PATH):
         print(f"ERROR: isd-history not found: {HISTORY_PATH}", file=sys.stderr); sys.exit(1)
@@ -275,17 +401,26 @@ def main():
         print(f"ERROR: isd-inventory not found: {INVENTORY_PATH}", file=sys.stderr); sys.exit(1)
 
     # 1) 读元数据与活跃年
-    sid2meta = parse_isd_history(HISTORY_PATH)
-    yearly_active = parse_isd_inventory(INVENTORY_PATH)
+    # 站表按列数组（SoA）+ sid→整数 id；逐年只做整数索引与布尔掩码，不再逐站查 dict
+    sid_to_idx, stations = parse_isd_history(HISTORY_PATH)
+    station_xy = np.column_stack([stations["lon"], stations["lat"]]).astype(float).reshape(-1, 2)
+
+    # 活跃年：按年分段的站行号（CSR）
+    year0, year_offsets, sid_idx = parse_isd_inventory(INVENTORY_PATH, sid_to_idx)
+    n_years = len(year_offsets) - 1
 
     # 2) 生成两个 setup 的统计与地图
     ensure_dir(OUT_DIR)
     min_y, max_y = MIN_YEAR, MAX_YEAR
 
+    # 各年地图交给进程池；每个进程只画一次底图，之后逐年只叠加站点
+    ex = ProcessPoolExecutor(max_workers=MAP_WORKERS, initializer=_init_map_worker, initargs=(BASE, BBOX, args.dpi))
+    futures = []
+
     for setup_name, cfg in SETUPS.items():
         filter_fn = cfg["filter_fn"]
-        # 先筛出满足条件的 station universe
-        universe = {sid for sid, rec in sid2meta.items() if filter_fn(rec)}
+        # 先筛出满足条件的 station universe（整列掩码，每个 setup 算一次）
+        universe_mask = np.asarray(filter_fn(stations), dtype=bool)
         # 输出计数文件
         out_txt = os.path.join(OUT_DIR, f"yearly_counts_{setup_name}.txt")
         fig_dir = os.path.join(OUT_DIR, setup_name)
@@ -294,15 +429,25 @@ def main():
         with open(out_txt, "w", encoding="utf-8") as fw:
             fw.write("# year  n_stations\n")
             for y in range(min_y, max_y + 1):
-                ids = yearly_active.get(y, set()) & universe
-                fw.write(f"{y} {len(ids)}\n")
-                pts = [(sid2meta[s]["lon"], sid2meta[s]["lat"]) for s in ids if s in sid2meta]
+                k = y - year0
+                idx = sid_idx[year_offsets[k]:year_offsets[k + 1]] if 0 <= k < n_years else sid_idx[:0]
+                idx = idx[universe_mask[idx]]
+                fw.write(f"{y} {len(idx)}\n")
                 out_png = os.path.join(fig_dir, f"stations_{y}.png")
-                draw_map(y, pts, out_png, BBOX, setup_label="ISD Station")
+                if not len(idx):
+                    # 无站年份不出图（只剩底图）；清掉旧运行留下的同名图，避免与计数不符
+                    if os.path.exists(out_png):
+                        os.remove(out_png)
+                    continue
+                pts = station_xy[idx]
+                futures.append(ex.submit(draw_map_worker, (y, pts, out_png, BBOX, "ISD Station")))
 
         print(f"[{setup_name}] wrote counts: {out_txt}")
         print(f"[{setup_name}] wrote maps to: {fig_dir}")
 
+    with ex:
+        for fut in futures:
+            fut.result()  # 子进程异常在此抛出
     print("All done.")
 
 if __name__ == "__main__":
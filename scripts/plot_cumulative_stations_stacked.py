@@ -5,10 +5,14 @@ import os
 import sys
 import math
 import argparse
-from collections import defaultdict, OrderedDict
+from collections import OrderedDict
 
 import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # 只写 PNG，不需要交互后端
 import matplotlib.pyplot as plt
+from matplotlib.patches import Patch
 
 # ========== 可配置区域 ==========
 BASE_DIR = os.path.expanduser("/data/ghcnd")
@@ -43,32 +47,45 @@ HILIGHT_YEARS = [1931, 1935, 1954, 1998]
 def ensure_dir(p: str):
     os.makedirs(p, exist_ok=True)
 
-def in_bbox(lat: float, lon: float, bbox: dict) -> bool:
-    return (bbox["lat_min"] <= lat <= bbox["lat_max"]) and (bbox["lon_min"] <= lon <= bbox["lon_max"])
+def in_bbox(lat, lon, bbox: dict):
+    """标量返回 bool；传入 numpy 数组时返回整列布尔掩码（一次向量化比较）"""
+    return ((lat >= bbox["lat_min"]) & (lat <= bbox["lat_max"])
+            & (lon >= bbox["lon_min"]) & (lon <= bbox["lon_max"]))
+
+INVENTORY_FIELDS = ("sid", "lat", "lon", "elem", "y1", "y2")
 
 def parse_inventory(inventory_path):
     """
     解析 ghcnd-inventory.txt
-    返回列表：[(sid, lat, lon, elem, y1, y2), ...]
+    标准格式（空白分隔）：ID LAT LON ELEMENT FIRSTYEAR LASTYEAR
+    返回按列存放的数组：{ 'sid', 'elem': str 数组, 'lat', 'lon': float 数组, 'y1', 'y2': int 数组 }，
+    第 i 个元素即第 i 条记录。
+    解析结果缓存为同目录 <inventory>.parquet（与 ghcnd_yearly_stats_and_maps.py 同一份），比 txt 新时直接读缓存。
     """
-    out = []
-    with open(inventory_path, "r", encoding="utf-8", errors="ignore") as fr:
-        for line in fr:
-            line = line.strip()
-            if not line or line.startswith("#"):
-                continue
-            parts = line.split()
-            if len(parts) < 5:
-                continue
-            sid = parts[0]
-            try:
-                lat = float(parts[1]); lon = float(parts[2])
-                elem = parts[3] if len(parts) >= 6 else "NA"
-                y1 = int(parts[-2]); y2 = int(parts[-1])
-                out.append((sid, lat, lon, elem, y1, y2))
-            except Exception:
-                continue
-    return out
+    cache = inventory_path + ".parquet"
+    try:
+        if os.path.getmtime(cache) > os.path.getmtime(inventory_path):
+            df = pd.read_parquet(cache)
+            return {c: df[c].to_numpy() for c in INVENTORY_FIELDS}
+    except Exception:
+        pass
+
+    # 空白分隔，C 引擎一次性解析（与 ghcnd_yearly_stats_and_maps.py 同一解析方式，缓存可互用）
+    df = pd.read_csv(
+        inventory_path, sep=r"\s+", engine="c", header=None, comment="#",
+        names=list(INVENTORY_FIELDS),
+        dtype=str, on_bad_lines="skip", encoding="utf-8", encoding_errors="ignore",
+    )
+    for col in ("lat", "lon", "y1", "y2"):
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    # 忽略异常行（列数不足 / 非数值）
+    df = df.dropna(subset=["sid", "lat", "lon", "y1", "y2"])
+    df = df.astype({"lat": "float64", "lon": "float64", "y1": "int32", "y2": "int32"}).reset_index(drop=True)
+    try:
+        df.to_parquet(cache, compression="zstd")
+    except Exception as e:
+        print(f"[warn] inventory cache not written: {e}")
+    return {c: df[c].to_numpy() for c in INVENTORY_FIELDS}
 
 def read_station_set_from_folder(folder):
     """
@@ -90,27 +107,34 @@ def build_yearly_active_sets(inventory, bbox, universe_ids):
     """
     返回：
       station_coord: {sid: (lon, lat)}
-      yearly_active: {year: set(sid)}  —— 该年内“有观测”的站点集合
+      yearly_active: (n_station, n_year) 布尔矩阵，行与 station_coord 的键同序，
+                     列为 YEAR_MIN..YEAR_MAX —— [i, k] 为 True 表示第 i 站该年“有观测”
     """
-    station_coord = {}
-    yearly_active = defaultdict(set)
+    years = np.arange(YEAR_MIN, YEAR_MAX + 1)
+    sid = inventory["sid"]
 
-    for sid, lat, lon, elem, y1, y2 in inventory:
-        if sid not in universe_ids:
-            continue
-        if not in_bbox(lat, lon, bbox):
-            continue
-        if sid not in station_coord:
-            station_coord[sid] = (lon, lat)
-        y1c = max(YEAR_MIN, y1)
-        y2c = min(YEAR_MAX, y2)
-        if y2c < YEAR_MIN or y1c > YEAR_MAX:
-            continue
-        for y in range(y1c, y2c + 1):
-            yearly_active[y].add(sid)
+    # universe 与 BBOX 都是整列掩码，一次筛出相关记录
+    keep = np.isin(sid, list(universe_ids)) & in_bbox(inventory["lat"], inventory["lon"], bbox)
+    sid = sid[keep]
+    lat, lon = inventory["lat"][keep], inventory["lon"][keep]
+    y1, y2 = inventory["y1"][keep], inventory["y2"][keep]
+
+    # 同一站多条要素记录：坐标取首条，活跃年取各条的并集
+    uniq, first, row = np.unique(sid, return_index=True, return_inverse=True)
+    station_coord = dict(zip(uniq.tolist(), zip(lon[first].tolist(), lat[first].tolist())))
+
+    # 记录 × 年份的广播比较即为逐条的活跃年；区间外的年份自然为 False
+    rec_active = (y1[:, None] <= years[None, :]) & (y2[:, None] >= years[None, :])
+    yearly_active = np.zeros((len(uniq), len(years)), dtype=bool)
+    np.logical_or.at(yearly_active, row, rec_active)
 
     return station_coord, yearly_active
 
+def _china_mask(station_coord, china_codes):
+    """站号前两位（国家码）属于 china_codes 的站；与 station_coord 的键同序"""
+    sids = np.array(list(station_coord), dtype=str)
+    return np.isin(sids.astype("U2"), list(china_codes))
+
 def yearly_counts_by_region(yearly_active, station_coord, china_codes):
     """
     基于 yearly_active 构造两个时间序列（逐年）：
@@ -118,17 +142,10 @@ def yearly_counts_by_region(yearly_active, station_coord, china_codes):
       - cnt_outside: 当年窗口内但中国区域外的站点数
     """
     years = list(range(YEAR_MIN, YEAR_MAX + 1))
-    cnt_china, cnt_outside = [], []
-    for y in years:
-        ids = yearly_active.get(y, set())
-        cn = 0
-        for sid in ids:
-            if sid in station_coord:
-                if sid[:2] in china_codes:
-                    cn += 1
-        cnt_china.append(cn)
-        cnt_outside.append(max(0, len(ids) - cn))
-    return years, np.array(cnt_china), np.array(cnt_outside)
+    is_cn = _china_mask(station_coord, china_codes)
+    cnt_china = yearly_active[is_cn].sum(axis=0)
+    cnt_outside = yearly_active[~is_cn].sum(axis=0)
+    return years, cnt_china, cnt_outside
 
 def cumulative_counts_by_region(yearly_active, station_coord, china_codes):
     """
@@ -137,42 +154,31 @@ def cumulative_counts_by_region(yearly_active, station_coord, china_codes):
       - cum_outside: 在大窗口内但中国区域外的累计站点数
     """
     years = list(range(YEAR_MIN, YEAR_MAX + 1))
-    seen_china = set()
-    seen_outside = set()
-
-    cum_china = []
-    cum_outside = []
-
-    for y in years:
-        ids = yearly_active.get(y, set())
-        for sid in ids:
-            if sid in station_coord:
-                if sid[:2] in china_codes:
-                    seen_china.add(sid)
-                else:
-                    seen_outside.add(sid)
-        cum_china.append(len(seen_china))
-        cum_outside.append(len(seen_outside))
-
-    return years, np.array(cum_china), np.array(cum_outside)
+    is_cn = _china_mask(station_coord, china_codes)
+    # 沿年份轴做逻辑或累积：[i, k] 为“第 i 站到第 k 年为止出现过”
+    ever = np.logical_or.accumulate(yearly_active, axis=1)
+    cum_china = ever[is_cn].sum(axis=0)
+    cum_outside = ever[~is_cn].sum(axis=0)
+    return years, cum_china, cum_outside
 
 # ========== 绘图 ==========
-def plot_stacked_cumulative_highlight(years, cum_china, cum_outside, out_png, title):
+# 科研绘图风格：模块加载时设置一次，各绘图函数不再重复 rcParams.update
+plt.rcParams.update({
+    "font.size": 10,
+    "axes.linewidth": 0.8,
+    "xtick.direction": "inout",
+    "ytick.direction": "inout",
+    "xtick.major.size": 4,
+    "ytick.major.size": 4
+})
+
+def _plot_stacked(years, n_china, n_outside, out_png, title, ylabel, labels):
     """
-    画累计堆叠柱状图（中国在上，外部在下），高亮特定年份并加箭头标注。
+    逐年 / 累计两种堆叠柱状图的共用实现（中国在上，外部在下），高亮特定年份并加箭头标注。
+    labels: (外部图例, 中国图例)
     """
     ensure_dir(os.path.dirname(out_png))
 
-    # 科研绘图风格
-    plt.rcParams.update({
-        "font.size": 10,
-        "axes.linewidth": 0.8,
-        "xtick.direction": "inout",
-        "ytick.direction": "inout",
-        "xtick.major.size": 4,
-        "ytick.major.size": 4
-    })
-
     fig, ax = plt.subplots(figsize=(11.5, 5.6), dpi=300)
 
     x = np.array(years)
@@ -184,22 +190,18 @@ def plot_stacked_cumulative_highlight(years, cum_china, cum_outside, out_png, ti
     col_out_hi     = "#2b5a99"  # 略深
     col_china_hi   = "#a83f3f"  # 略深
 
-    # 为每个年份准备颜色数组（遇到高亮年份换色）
-    out_colors   = [col_out_hi if y in HILIGHT_YEARS else col_out_base for y in years]
-    china_colors = [col_china_hi if y in HILIGHT_YEARS else col_china_base for y in years]
+    hi = np.isin(x, HILIGHT_YEARS)  # 高亮年份掩码，整列一次判定
+    out_colors   = np.where(hi, col_out_hi, col_out_base)
+    china_colors = np.where(hi, col_china_hi, col_china_base)
 
-    # 先画“外部（大窗口内非中国）”——在下方
-    bars_out = ax.bar(x, cum_outside, width=width, color=out_colors, edgecolor="none", label="Outside China (within window, cumulative)")
+    # 先画“外部（大窗口内非中国）”在下，再画“中国”堆在上方
+    ax.bar(x, n_outside, width=width, color=out_colors, edgecolor="none", label=labels[0])
+    ax.bar(x, n_china, width=width, bottom=n_outside, color=china_colors, edgecolor="none", label=labels[1])
 
-    # 再画“中国”——堆在上方
-    bars_cn = ax.bar(x, cum_china, width=width, bottom=cum_outside, color=china_colors, edgecolor="none", label="China (cumulative)")
-
-    # 坐标轴 & 网格
+    # 坐标轴 & 刻度（每 10 年）
     ax.set_xlim(years[0] - 0.5, years[-1] + 0.5)
-    ax.set_ylabel("Cumulative number of stations")
+    ax.set_ylabel(ylabel)
     ax.set_xlabel("Year")
-
-    # x 轴刻度（每 10 年）
     step = 10 if len(years) > 70 else 5
     xticks = list(range(years[0] - (years[0] % step) + step, years[-1] + 1, step))
     ax.set_xticks(xticks)
@@ -207,27 +209,22 @@ def plot_stacked_cumulative_highlight(years, cum_china, cum_outside, out_png, ti
     # 只显示左/下坐标数字，但四边保留短刻度线
     ax.tick_params(bottom=True, top=True, left=True, right=True,
                    labelbottom=True, labelleft=True, labeltop=False, labelright=False, pad=2)
-
-    # 边框
     for spine in ["left", "bottom", "right", "top"]:
         ax.spines[spine].set_visible(True)
         ax.spines[spine].set_color("black")
         ax.spines[spine].set_linewidth(0.8)
 
-    # 图例与标题
     # 用“代理艺术家”确保图例颜色与标签稳定
-    from matplotlib.patches import Patch
     legend_handles = [
-        Patch(facecolor=col_out_base,   edgecolor='none', label="Outside China (within window, cumulative)"),
-        Patch(facecolor=col_china_base, edgecolor='none', label="China (cumulative)")
+        Patch(facecolor=col_out_base,   edgecolor='none', label=labels[0]),
+        Patch(facecolor=col_china_base, edgecolor='none', label=labels[1])
     ]
     ax.legend(handles=legend_handles, loc="upper left", frameon=True, framealpha=0.9)
     ax.set_title(title)
 
-    # ---- 高亮年份的箭头标注 ----
-    top_total = cum_outside + cum_china
+    # ---- 高亮年份的箭头标注：指向该年总和的顶端 ----
+    top_total = n_outside + n_china
     y_max = float(top_total.max())
-    # 箭头和文字的相对偏移
     dy = max(10.0, 0.02 * y_max)  # 文字与箭头头部上方的距离
     for y in HILIGHT_YEARS:
         if y < years[0] or y > years[-1]:
@@ -235,8 +232,6 @@ def plot_stacked_cumulative_highlight(years, cum_china, cum_outside, out_png, ti
         idx = y - years[0]
         x_pos = years[idx]
         y_pos = top_total[idx]
-
-        # 注解文字：稍向上偏移
         ax.annotate(
             f"{y}",
             xy=(x_pos, y_pos), xycoords="data",
@@ -252,84 +247,15 @@ def plot_stacked_cumulative_highlight(years, cum_china, cum_outside, out_png, ti
     fig.savefig(out_png, bbox_inches="tight")
     plt.close(fig)
 
-def plot_stacked_yearly_highlight(years, n_china, n_outside, out_png, title):
-    """
-    画逐年堆叠柱状图（中国在上，外部在下），高亮特定年份并加箭头标注。
-    """
-    ensure_dir(os.path.dirname(out_png))
-
-    # 科研绘图风格（与累计版一致）
-    plt.rcParams.update({
-        "font.size": 10,
-        "axes.linewidth": 0.8,
-        "xtick.direction": "inout",
-        "ytick.direction": "inout",
-        "xtick.major.size": 4,
-        "ytick.major.size": 4
-    })
-
-    fig, ax = plt.subplots(figsize=(11.5, 5.6), dpi=300)
-    x = np.array(years)
-    width = 0.92
-
-    # 颜色（沿用累计版）
-    col_out_base   = "#4575b4"
-    col_china_base = "#c74b4b"
-    col_out_hi     = "#2b5a99"
-    col_china_hi   = "#a83f3f"
-
-    out_colors   = [col_out_hi if y in HILIGHT_YEARS else col_out_base for y in years]
-    china_colors = [col_china_hi if y in HILIGHT_YEARS else col_china_base for y in years]
-
-    # 先画“外部”在下，再画“中国”在上 —— 这里堆叠的是“当年数量”（非累计）
-    bars_out = ax.bar(x, n_outside, width=width, color=out_colors, edgecolor="none",
-                      label="Outside China (within window)")
-    bars_cn  = ax.bar(x, n_china,   width=width, bottom=n_outside, color=china_colors, edgecolor="none",
-                      label="China")
-
-    # 坐标轴 & 刻度
-    ax.set_xlim(years[0] - 0.5, years[-1] + 0.5)
-    ax.set_ylabel("Number of stations")      # ← 修改点
-    ax.set_xlabel("Year")
-    step = 10 if len(years) > 70 else 5
-    xticks = list(range(years[0] - (years[0] % step) + step, years[-1] + 1, step))
-    ax.set_xticks(xticks)
-    ax.tick_params(bottom=True, top=True, left=True, right=True,
-                   labelbottom=True, labelleft=True, labeltop=False, labelright=False, pad=2)
-    for spine in ["left", "bottom", "right", "top"]:
-        ax.spines[spine].set_visible(True)
-        ax.spines[spine].set_color("black")
-        ax.spines[spine].set_linewidth(0.8)
-
-    # 图例（无“cumulative”字样）
-    from matplotlib.patches import Patch
-    legend_handles = [
-        Patch(facecolor=col_out_base,   edgecolor='none', label="Outside China (within window)"),
-        Patch(facecolor=col_china_base, edgecolor='none', label="China")
-    ]
-    ax.legend(handles=legend_handles, loc="upper left", frameon=True, framealpha=0.9)
-    ax.set_title(title)
-
-    # 高亮四年份的箭头（逻辑可直接复用）
-    top_total = n_outside + n_china
-    y_max = float(top_total.max())
-    dy = max(10.0, 0.02 * y_max)
-    for y in HILIGHT_YEARS:
-        if y < years[0] or y > years[-1]:
-            continue
-        idx = y - years[0]
-        x_pos = years[idx]
-        y_pos = top_total[idx]
-        ax.annotate(f"{y}",
-                    xy=(x_pos, y_pos), xycoords="data",
-                    xytext=(x_pos, y_pos + dy), textcoords="data",
-                    ha="center", va="bottom", fontsize=10,
-                    arrowprops=dict(arrowstyle="->", lw=0.9, shrinkA=0, shrinkB=0))
+def plot_stacked_cumulative_highlight(years, cum_china, cum_outside, out_png, title):
+    """画累计堆叠柱状图（中国在上，外部在下），高亮特定年份并加箭头标注。"""
+    _plot_stacked(years, cum_china, cum_outside, out_png, title, "Cumulative number of stations",
+                  ("Outside China (within window, cumulative)", "China (cumulative)"))
 
-    ax.set_ylim(0, y_max + 3 * dy)
-    fig.tight_layout()
-    fig.savefig(out_png, bbox_inches="tight")
-    plt.close(fig)
+def plot_stacked_yearly_highlight(years, n_china, n_outside, out_png, title):
+    """画逐年堆叠柱状图（中国在上，外部在下），高亮特定年份并加箭头标注。"""
+    _plot_stacked(years, n_china, n_outside, out_png, title, "Number of stations",
+                  ("Outside China (within window)", "China"))
 
 # ========== 主流程 ==========
 def main():
@@ -354,7 +280,7 @@ def main():
     universe_ids = read_station_set_from_folder(setup_folder)
     print(f"[{args.setup}] universe size = {len(universe_ids)}")
 
-    # 3) 基于 BBOX + universe 构建“每年活跃站点集合”
+    # 3) 基于 BBOX + universe 构建“逐站逐年活跃”布尔矩阵
     station_coord, yearly_active = build_yearly_active_sets(inv, BBOX, universe_ids)
 
     # 原来：
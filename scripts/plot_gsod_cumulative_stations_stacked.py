@@ -6,11 +6,15 @@ import sys
 import math
 import argparse
 import re
-from collections import defaultdict, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
 
 import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # 只写 PNG，不需要交互后端
 import matplotlib.pyplot as plt
+from matplotlib.patches import Patch
 
 # ========== 可配置区域 ==========
 # GSOD 索引目录（之前我们生成的是 /data/gsod/index/gsod_index_YYYY.csv）
@@ -28,9 +32,16 @@ YEAR_MIN, YEAR_MAX = 1901, 2025
 # 需要高亮与加箭头的年份
 HILIGHT_YEARS = [1931, 1935, 1954, 1998]
 
+# 并发读取逐年索引的线程数（I/O + C 解析为主，解析时释放 GIL）
+INDEX_WORKERS = 8
+
 # GSOD 索引的国家列中，中国常见代码：优先 CH，其次 CN/CHN，并兼容港澳台
 CHINA_CODES_DEFAULT = {"CH", "CN", "CHN", "HK", "MC", "TW"}
 
+# 索引里本脚本用到的列及其类型；station_id 按字符串读，保留前导零
+# （用 pandas 默认 C 引擎：它在解析时就按 dtype 取字符串；pyarrow 引擎会先推断成整数再转，前导零已丢）
+INDEX_DTYPES = {"station_id": "string", "lon": "float64", "lat": "float64", "country": "string"}
+
 # ========== 工具函数 ==========
 def ensure_dir(p: str):
     os.makedirs(p, exist_ok=True)
@@ -63,15 +74,45 @@ def load_year_index(year: int):
     if not os.path.exists(fp):
         return None
     try:
-        df = pd.read_csv(fp)
+        # 先只读表头，再按列投影 + 指定类型解析（不读名称/海拔等用不到的列，也不做类型推断）
+        usecols = [c for c in pd.read_csv(fp, nrows=0).columns if c in INDEX_DTYPES]
         # 必要列检查
-        if not {"lon", "lat"}.issubset(df.columns):
+        if not {"lon", "lat"}.issubset(usecols):
             return None
-        return df
+        return pd.read_csv(fp, usecols=usecols, dtype={c: INDEX_DTYPES[c] for c in usecols})
     except Exception:
         return None
 
 # ========== 统计逻辑 ==========
+def _load_year_frame(y: int, china_codes):
+    """
+    读一年索引，统一成 DataFrame(sid, lon, lat, is_cn)；无数据返回 None。
+    各年文件的列可能不同（缺 station_id / country），在这里逐年归一后才能拼接。
+    """
+    df = load_year_index(y)
+    if df is None or df.empty:
+        return None
+
+    # 站点ID列名适配
+    sid_col = "station_id" if "station_id" in df.columns else None
+    if sid_col is None:
+        # 若没有 station_id，就把 lon/lat 组合成穷举 ID（极少见；只是兜底）
+        # 整列格式化（与逐行 f"{lon:.5f}_{lat:.5f}" 结果一致），不走 apply(axis=1)
+        lon5 = np.char.mod("%.5f", df["lon"].to_numpy(dtype=float))
+        lat5 = np.char.mod("%.5f", df["lat"].to_numpy(dtype=float))
+        df["__sid__"] = np.char.add(np.char.add(lon5, "_"), lat5)
+        sid_col = "__sid__"
+
+    # 国家列（用于中国判定）
+    if "country" in df.columns:
+        # 标准化为大写字符串
+        is_cn = df["country"].astype(str).str.upper().isin(china_codes).to_numpy()
+    else:
+        # 没有国家列就标记为 False（不纳入中国累计）；如需空间判断可后续扩展
+        is_cn = np.zeros(len(df), dtype=bool)
+    return pd.DataFrame({"sid": df[sid_col].astype(str).to_numpy(), "lon": df["lon"].to_numpy(dtype=float),
+                         "lat": df["lat"].to_numpy(dtype=float), "is_cn": is_cn})
+
 def build_yearly_active_sets_from_gsod_index(bbox, china_codes):
     """
     基于 /data/gsod/index/gsod_index_YYYY.csv 构造：
@@ -79,50 +120,24 @@ def build_yearly_active_sets_from_gsod_index(bbox, china_codes):
       yearly_active: {year: set(sid)}  —— 该年内“在 BBOX 内”的站点集合
       sid_is_china:  {sid: bool}       —— 站点是否属于中国（优先用 country 列判定）
     """
-    station_coord = {}
-    yearly_active = defaultdict(set)
-    sid_is_china  = {}
-
+    # 各年读取交给线程池并发，按年份升序拼成一张表（带 year 列），之后 BBOX 与汇总都只做一次
     years = list_index_years(GSOD_INDEX_DIR)
-    for y in years:
-        df = load_year_index(y)
-        if df is None or df.empty:
-            continue
-
-        # 只统计 BBOX 内
-        df = df[(df["lon"]>=bbox["lon_min"]) & (df["lon"]<=bbox["lon_max"]) &
-                (df["lat"]>=bbox["lat_min"]) & (df["lat"]<=bbox["lat_max"])]
-
-        if df.empty:
-            continue
-
-        # 站点ID列名适配
-        sid_col = "station_id" if "station_id" in df.columns else None
-        if sid_col is None:
-            # 若没有 station_id，就把 lon/lat 组合成穷举 ID（极少见；只是兜底）
-            df["__sid__"] = df.apply(lambda r: f"{r['lon']:.5f}_{r['lat']:.5f}", axis=1)
-            sid_col = "__sid__"
-
-        # 国家列（用于中国判定）
-        has_country = "country" in df.columns
-        if has_country:
-            # 标准化为大写字符串
-            df["country"] = df["country"].astype(str).str.upper()
-
-        for _, row in df.iterrows():
-            sid = str(row[sid_col])
-            lon = float(row["lon"])
-            lat = float(row["lat"])
-            station_coord.setdefault(sid, (lon, lat))
-            yearly_active[y].add(sid)
-
-            if sid not in sid_is_china:
-                if has_country:
-                    sid_is_china[sid] = (row["country"] in china_codes)
-                else:
-                    # 没有国家列就标记为 False（不纳入中国累计）；如需空间判断可后续扩展
-                    sid_is_china[sid] = False
-
+    with ThreadPoolExecutor(max_workers=INDEX_WORKERS) as ex:
+        frames = [df.assign(year=y) for y, df in zip(years, ex.map(lambda y: _load_year_frame(y, china_codes), years))
+                  if df is not None]
+    if not frames:
+        return {}, {}, {}
+    big = pd.concat(frames, ignore_index=True)
+
+    # 只统计 BBOX 内
+    big = big[(big["lon"]>=bbox["lon_min"]) & (big["lon"]<=bbox["lon_max"]) &
+              (big["lat"]>=bbox["lat_min"]) & (big["lat"]<=bbox["lat_max"])]
+
+    yearly_active = big.groupby("year")["sid"].agg(set).to_dict()
+    # 按年份升序拼接，去重保留的即各站最早出现的一行：坐标与国家归属以首次出现为准
+    first = big.drop_duplicates("sid")
+    station_coord = dict(zip(first["sid"], zip(first["lon"], first["lat"])))
+    sid_is_china  = dict(zip(first["sid"], first["is_cn"]))
     return station_coord, yearly_active, sid_is_china
 
 def yearly_counts_by_region_from_index(years, yearly_active, sid_is_china, station_coord):
@@ -145,89 +160,85 @@ def yearly_counts_by_region_from_index(years, yearly_active, sid_is_china, stati
 
 def cumulative_counts_by_region_from_index(years, yearly_active, sid_is_china, station_coord):
     """
-    返回 years, cum_china, cum_outside —— 站点累计（去重）
+    返回 cum_china, cum_outside —— 站点累计（去重）
     """
-    seen_china = set()
-    seen_outside = set()
-
-    cum_china = []
-    cum_outside = []
-
-    for y in years:
-        ids = yearly_active.get(y, set())
-        for sid in ids:
-            if sid not in station_coord:
-                continue
-            if sid_is_china.get(sid, False):
-                seen_china.add(sid)
-            else:
-                seen_outside.add(sid)
-        cum_china.append(len(seen_china))
-        cum_outside.append(len(seen_outside))
+    # 站 × 年 布尔矩阵：行与 station_coord 的键同序
+    row = {sid: i for i, sid in enumerate(station_coord)}
+    active = np.zeros((len(row), len(years)), dtype=bool)
+    for k, y in enumerate(years):
+        idx = [row[sid] for sid in yearly_active.get(y, ()) if sid in row]
+        active[idx, k] = True
+    is_cn = np.array([sid_is_china.get(sid, False) for sid in row], dtype=bool)
+
+    # 沿年份轴做逻辑或累积：[i, k] 为“第 i 站到第 k 年为止出现过”，按列求和即累计站数
+    ever = np.logical_or.accumulate(active, axis=1)
+    return ever[is_cn].sum(axis=0), ever[~is_cn].sum(axis=0)
 
-    return np.array(cum_china), np.array(cum_outside)
-
-def plot_stacked_yearly_highlight(years, n_china, n_outside, out_png, title):
+# ========== 绘图（完全沿用 GHCNd 样式）==========
+# 科研绘图风格：模块加载时设置一次，各绘图函数不再重复 rcParams.update
+plt.rcParams.update({
+    "font.size": 10,
+    "axes.linewidth": 0.8,
+    "xtick.direction": "inout",
+    "ytick.direction": "inout",
+    "xtick.major.size": 4,
+    "ytick.major.size": 4
+})
+
+def _plot_stacked(years, n_china, n_outside, out_png, title, ylabel, labels):
+    """
+    逐年 / 累计两种堆叠柱状图的共用实现（中国在上，外部在下），高亮特定年份并加箭头标注。
+    labels: (外部图例, 中国图例)
+    """
     ensure_dir(os.path.dirname(out_png))
 
-    plt.rcParams.update({
-        "font.size": 10,
-        "axes.linewidth": 0.8,
-        "xtick.direction": "inout",
-        "ytick.direction": "inout",
-        "xtick.major.size": 4,
-        "ytick.major.size": 4
-    })
-
     fig, ax = plt.subplots(figsize=(11.5, 5.6), dpi=300)
 
     x = np.array(years)
-    width = 0.92
+    width = 0.92  # 略窄，避免完全贴合
 
-    # 与累计版一致的配色方案
+    # 颜色方案（常规 + 高亮）——与 GHCNd 版保持一致
     col_out_base   = "#4575b4"
     col_china_base = "#c74b4b"
-    col_out_hi     = "#2b5a99"
-    col_china_hi   = "#a83f3f"
+    col_out_hi     = "#2b5a99"  # 略深
+    col_china_hi   = "#a83f3f"  # 略深
 
-    out_colors   = [col_out_hi if y in HILIGHT_YEARS else col_out_base for y in years]
-    china_colors = [col_china_hi if y in HILIGHT_YEARS else col_china_base for y in years]
+    hi = np.isin(x, HILIGHT_YEARS)  # 高亮年份掩码，整列一次判定
+    out_colors   = np.where(hi, col_out_hi, col_out_base)
+    china_colors = np.where(hi, col_china_hi, col_china_base)
 
-    # 逐年堆叠（外部在下，中国在上）
-    bars_out = ax.bar(x, n_outside, width=width, color=out_colors, edgecolor="none",
-                      label="Outside China (within window)")
-    bars_cn  = ax.bar(x, n_china,   width=width, bottom=n_outside, color=china_colors, edgecolor="none",
-                      label="China")
+    # 先画“外部（大窗口内非中国）”在下，再画“中国”堆在上方
+    ax.bar(x, n_outside, width=width, color=out_colors, edgecolor="none", label=labels[0])
+    ax.bar(x, n_china, width=width, bottom=n_outside, color=china_colors, edgecolor="none", label=labels[1])
 
+    # 坐标轴 & 刻度（每 10 年）
     ax.set_xlim(years[0] - 0.5, years[-1] + 0.5)
-    ax.set_ylabel("Number of stations")  # 非累计
+    ax.set_ylabel(ylabel)
     ax.set_xlabel("Year")
-
     step = 10 if len(years) > 70 else 5
     xticks = list(range(years[0] - (years[0] % step) + step, years[-1] + 1, step))
     ax.set_xticks(xticks)
 
+    # 只显示左/下坐标数字，但四边保留短刻度线
     ax.tick_params(bottom=True, top=True, left=True, right=True,
                    labelbottom=True, labelleft=True, labeltop=False, labelright=False, pad=2)
-
     for spine in ["left", "bottom", "right", "top"]:
         ax.spines[spine].set_visible(True)
         ax.spines[spine].set_color("black")
         ax.spines[spine].set_linewidth(0.8)
 
-    from matplotlib.patches import Patch
+    # 用“代理艺术家”确保图例颜色与标签稳定
     legend_handles = [
-        Patch(facecolor=col_out_base,   edgecolor='none', label="Outside China (within window)"),
-        Patch(facecolor=col_china_base, edgecolor='none', label="China")
+        Patch(facecolor=col_out_base,   edgecolor='none', label=labels[0]),
+        Patch(facecolor=col_china_base, edgecolor='none', label=labels[1])
     ]
     ax.legend(handles=legend_handles, loc="upper left", frameon=True, framealpha=0.9)
     ax.set_title(title)
 
-    # 箭头依旧指向“该年总和”的顶端
+    # ---- 高亮年份的箭头标注：指向该年总和的顶端 ----
     top_total = n_outside + n_china
     y_max = float(top_total.max())
-    dy = max(10.0, 0.02 * y_max)
-
+    dy = max(10.0, 0.02 * y_max)  # 文字与箭头头部上方的距离
     for y in HILIGHT_YEARS:
         if y < years[0] or y > years[-1]:
             continue
@@ -242,92 +253,22 @@ def plot_stacked_yearly_highlight(years, n_china, n_outside, out_png, title):
             arrowprops=dict(arrowstyle="->", lw=0.9, shrinkA=0, shrinkB=0)
         )
 
+    # 顶部留白，避免箭头文字贴边
     ax.set_ylim(0, y_max + 3 * dy)
 
     fig.tight_layout()
     fig.savefig(out_png, bbox_inches="tight")
     plt.close(fig)
 
-# ========== 绘图（完全沿用 GHCNd 样式）==========
 def plot_stacked_cumulative_highlight(years, cum_china, cum_outside, out_png, title):
-    ensure_dir(os.path.dirname(out_png))
-
-    # 科研绘图风格
-    plt.rcParams.update({
-        "font.size": 10,
-        "axes.linewidth": 0.8,
-        "xtick.direction": "inout",
-        "ytick.direction": "inout",
-        "xtick.major.size": 4,
-        "ytick.major.size": 4
-    })
-
-    fig, ax = plt.subplots(figsize=(11.5, 5.6), dpi=300)
-
-    x = np.array(years)
-    width = 0.92
-
-    # 颜色方案（常规 + 高亮）——与 GHCNd 版保持一致
-    col_out_base   = "#4575b4"
-    col_china_base = "#c74b4b"
-    col_out_hi     = "#2b5a99"
-    col_china_hi   = "#a83f3f"
-
-    out_colors   = [col_out_hi if y in HILIGHT_YEARS else col_out_base for y in years]
-    china_colors = [col_china_hi if y in HILIGHT_YEARS else col_china_base for y in years]
+    """画累计堆叠柱状图（中国在上，外部在下），高亮特定年份并加箭头标注。"""
+    _plot_stacked(years, cum_china, cum_outside, out_png, title, "Cumulative number of stations",
+                  ("Outside China (within window, cumulative)", "China (cumulative)"))
 
-    bars_out = ax.bar(x, cum_outside, width=width, color=out_colors, edgecolor="none",
-                      label="Outside China (within window, cumulative)")
-    bars_cn  = ax.bar(x, cum_china,   width=width, bottom=cum_outside, color=china_colors, edgecolor="none",
-                      label="China (cumulative)")
-
-    ax.set_xlim(years[0] - 0.5, years[-1] + 0.5)
-    ax.set_ylabel("Cumulative number of stations")
-    ax.set_xlabel("Year")
-
-    step = 10 if len(years) > 70 else 5
-    xticks = list(range(years[0] - (years[0] % step) + step, years[-1] + 1, step))
-    ax.set_xticks(xticks)
-
-    ax.tick_params(bottom=True, top=True, left=True, right=True,
-                   labelbottom=True, labelleft=True, labeltop=False, labelright=False, pad=2)
-
-    for spine in ["left", "bottom", "right", "top"]:
-        ax.spines[spine].set_visible(True)
-        ax.spines[spine].set_color("black")
-        ax.spines[spine].set_linewidth(0.8)
-
-    from matplotlib.patches import Patch
-    legend_handles = [
-        Patch(facecolor=col_out_base,   edgecolor='none', label="Outside China (within window, cumulative)"),
-        Patch(facecolor=col_china_base, edgecolor='none', label="China (cumulative)")
-    ]
-    ax.legend(handles=legend_handles, loc="upper left", frameon=True, framealpha=0.9)
-    ax.set_title(title)
-
-    top_total = cum_outside + cum_china
-    y_max = float(top_total.max())
-    dy = max(10.0, 0.02 * y_max)
-
-    for y in HILIGHT_YEARS:
-        if y < years[0] or y > years[-1]:
-            continue
-        idx = y - years[0]
-        x_pos = years[idx]
-        y_pos = top_total[idx]
-        ax.annotate(
-            f"{y}",
-            xy=(x_pos, y_pos), xycoords="data",
-            xytext=(x_pos, y_pos + dy), textcoords="data",
-            ha="center", va="bottom", fontsize=10,
-            arrowprops=dict(arrowstyle="->", lw=0.9, shrinkA=0, shrinkB=0)
-        )
-
-    ax.set_ylim(0, y_max + 3 * dy)
-
-    fig.tight_layout()
-    fig.savefig(out_png, bbox_inches="tight")
-    plt.close(fig)
+def plot_stacked_yearly_highlight(years, n_china, n_outside, out_png, title):
+    """画逐年堆叠柱状图（中国在上，外部在下），高亮特定年份并加箭头标注。"""
+    _plot_stacked(years, n_china, n_outside, out_png, title, "Number of stations",
+                  ("Outside China (within window)", "China"))
 
 # ========== 主流程 ==========
 def main():
@@ -6,10 +6,12 @@ import sys
 import math
 import argparse
 import re
-from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import pandas as pd
+import matplotlib
+matplotlib.use("Agg")  # 只写 PNG，不需要交互后端
 import matplotlib.pyplot as plt
 
 # ========== 可配置区域 ==========
@@ -28,9 +30,16 @@ YEAR_MIN, YEAR_MAX = 1901, 2025
 # 需要高亮与加箭头的年份
 HILIGHT_YEARS = [1931, 1935, 1954, 1998]
 
+# 并发读取逐年索引的线程数（I/O + C 解析为主，解析时释放 GIL）
+INDEX_WORKERS = 8
+
 # ISD 索引的 country 列中，视为“中国”的代码集合（兼容港澳台）
 CHINA_CODES_DEFAULT = {"CHN", "CH", "CN", "HK", "MC", "TW"}
 
+# 索引里本脚本用到的列及其类型；station_id 按字符串读，保留前导零
+# （用 pandas 默认 C 引擎：它在解析时就按 dtype 取字符串；pyarrow 引擎会先推断成整数再转，前导零已丢）
+INDEX_DTYPES = {"station_id": "string", "lon": "float64", "lat": "float64", "country": "string"}
+
 # ========== 工具函数 ==========
 def ensure_dir(p: str):
     os.makedirs(p, exist_ok=True)
@@ -60,14 +69,43 @@ def load_year_index(year: int):
     if not os.path.exists(fp):
         return None
     try:
-        df = pd.read_csv(fp)
-        if not {"lon", "lat"}.issubset(df.columns):
+        # 先只读表头，再按列投影 + 指定类型解析（不读名称/海拔等用不到的列，也不做类型推断）
+        usecols = [c for c in pd.read_csv(fp, nrows=0).columns if c in INDEX_DTYPES]
+        # 必要列检查
+        if not {"lon", "lat"}.issubset(usecols):
             return None
-        return df
+        return pd.read_csv(fp, usecols=usecols, dtype={c: INDEX_DTYPES[c] for c in usecols})
     except Exception:
         return None
 
 # ========== 统计逻辑（与 GSOD 版等价）==========
+def _load_year_frame(y: int, china_codes):
+    """
+    读一年索引，统一成 DataFrame(sid, lon, lat, is_cn)；无数据返回 None。
+    各年文件的列可能不同（缺 station_id / country），在这里逐年归一后才能拼接。
+    """
+    df = load_year_index(y)
+    if df is None or df.empty:
+        return None
+
+    # 站点ID列名：优先使用 station_id；若没有则以 lon/lat 拼装兜底
+    sid_col = "station_id" if "station_id" in df.columns else None
+    if sid_col is None:
+        # 整列格式化（与逐行 f"{lon:.5f}_{lat:.5f}" 结果一致），不走 apply(axis=1)
+        lon5 = np.char.mod("%.5f", df["lon"].to_numpy(dtype=float))
+        lat5 = np.char.mod("%.5f", df["lat"].to_numpy(dtype=float))
+        df["__sid__"] = np.char.add(np.char.add(lon5, "_"), lat5)
+        sid_col = "__sid__"
+
+    # 国家列（用于中国判定）
+    if "country" in df.columns:
+        is_cn = df["country"].astype(str).str.upper().isin(china_codes).to_numpy()
+    else:
+        # 没有国家列就标记为 False（不纳入中国累计）；如需空间判断可后续扩展
+        is_cn = np.zeros(len(df), dtype=bool)
+    return pd.DataFrame({"sid": df[sid_col].astype(str).to_numpy(), "lon": df["lon"].to_numpy(dtype=float),
+                         "lat": df["lat"].to_numpy(dtype=float), "is_cn": is_cn})
+
 def build_yearly_active_sets_from_isd_index(bbox, china_codes):
     """
     基于 /data/isd/index/isd_index_YYYY.csv 构造：
@@ -75,48 +113,24 @@ def build_yearly_active_sets_from_isd_index(bbox, china_codes):
       yearly_active: {year: set(sid)}  —— 该年内“在 BBOX 内”的站点集合
       sid_is_china:  {sid: bool}       —— 站点是否属于中国（优先用 country 列判定）
     """
-    station_coord = {}
-    yearly_active = defaultdict(set)
-    sid_is_china  = {}
-
+    # 各年读取交给线程池并发，按年份升序拼成一张表（带 year 列），之后 BBOX 与汇总都只做一次
     years = list_index_years(ISD_INDEX_DIR)
-    for y in years:
-        df = load_year_index(y)
-        if df is None or df.empty:
-            continue
-
-        # 只统计 BBOX 内
-        df = df[(df["lon"]>=bbox["lon_min"]) & (df["lon"]<=bbox["lon_max"]) &
-                (df["lat"]>=bbox["lat_min"]) & (df["lat"]<=bbox["lat_max"])]
-
-        if df.empty:
-            continue
-
-        # 站点ID列名：优先使用 station_id；若没有则以 lon/lat 拼装兜底
-        sid_col = "station_id" if "station_id" in df.columns else None
-        if sid_col is None:
-            df["__sid__"] = df.apply(lambda r: f"{r['lon']:.5f}_{r['lat']:.5f}", axis=1)
-            sid_col = "__sid__"
-
-        # 国家列（用于中国判定）
-        has_country = "country" in df.columns
-        if has_country:
-            df["country"] = df["country"].astype(str).str.upper()
-
-        for _, row in df.iterrows():
-            sid = str(row[sid_col])
-            lon = float(row["lon"])
-            lat = float(row["lat"])
-            station_coord.setdefault(sid, (lon, lat))
-            yearly_active[y].add(sid)
-
-            if sid not in sid_is_china:
-                if has_country:
-                    sid_is_china[sid] = (row["country"] in china_codes)
-                else:
-                    # 没有国家列就标记为 False（不纳入中国累计）；如需空间判断可后续扩展
-                    sid_is_china[sid] = False
-
+    with ThreadPoolExecutor(max_workers=INDEX_WORKERS) as ex:
+        frames = [df.assign(year=y) for y, df in zip(years, ex.map(lambda y: _load_year_frame(y, china_codes), years))
+                  if df is not None]
+    if not frames:
+        return {}, {}, {}
+    big = pd.concat(frames, ignore_index=True)
+
+    # 只统计 BBOX 内
+    big = big[(big["lon"]>=bbox["lon_min"]) & (big["lon"]<=bbox["lon_max"]) &
+              (big["lat"]>=bbox["lat_min"]) & (big["lat"]<=bbox["lat_max"])]
+
+    yearly_active = big.groupby("year")["sid"].agg(set).to_dict()
+    # 按年份升序拼接，去重保留的即各站最早出现的一行：坐标与国家归属以首次出现为准
+    first = big.drop_duplicates("sid")
+    station_coord = dict(zip(first["sid"], zip(first["lon"], first["lat"])))
+    sid_is_china  = dict(zip(first["sid"], first["is_cn"]))
     return station_coord, yearly_active, sid_is_china
 
 def yearly_counts_by_region_from_index(years, yearly_active, sid_is_china, station_coord):
@@ -138,18 +152,19 @@ def yearly_counts_by_region_from_index(years, yearly_active, sid_is_china, stati
     return np.array(n_china), np.array(n_outside)
 
 # ========== 绘图（逐年堆叠 + 高亮箭头，与 GSOD 版一致）==========
+# 科研绘图风格：模块加载时设置一次，各绘图函数不再重复 rcParams.update
+plt.rcParams.update({
+    "font.size": 10,
+    "axes.linewidth": 0.8,
+    "xtick.direction": "inout",
+    "ytick.direction": "inout",
+    "xtick.major.size": 4,
+    "ytick.major.size": 4
+})
+
 def plot_stacked_yearly_highlight(years, n_china, n_outside, out_png, title):
     ensure_dir(os.path.dirname(out_png))
 
-    plt.rcParams.update({
-        "font.size": 10,
-        "axes.linewidth": 0.8,
-        "xtick.direction": "inout",
-        "ytick.direction": "inout",
-        "xtick.major.size": 4,
-        "ytick.major.size": 4
-    })
-
     fig, ax = plt.subplots(figsize=(11.5, 5.6), dpi=300)
 
     x = np.array(years)
@@ -161,8 +176,9 @@ def plot_stacked_yearly_highlight(years, n_china, n_outside, out_png, title):
     col_out_hi     = "#2b5a99"
     col_china_hi   = "#a83f3f"
 
-    out_colors   = [col_out_hi if y in HILIGHT_YEARS else col_out_base for y in years]
-    china_colors = [col_china_hi if y in HILIGHT_YEARS else col_china_base for y in years]
+    hi = np.isin(x, HILIGHT_YEARS)  # 高亮年份掩码，整列一次判定
+    out_colors   = np.where(hi, col_out_hi, col_out_base)
+    china_colors = np.where(hi, col_china_hi, col_china_base)
 
     # 逐年堆叠（外部在下，中国在上）
     ax.bar(x, n_outside, width=width, color=out_colors, edgecolor="none",
@@ -14,9 +14,11 @@ and writes summary + missing-in-raw reports for both target regions.
 """
 
 from __future__ import annotations
+import errno
 import os
 import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Tuple, Iterable, List
 
 # =========================
@@ -46,18 +48,21 @@ os.makedirs(OUT_BASIN, exist_ok=True)
 os.makedirs(OUT_BIGWIN, exist_ok=True)
 os.makedirs(REPORT_DIR, exist_ok=True)
 
+# Copy is metadata-bound (open/stat/create per small file); threads overlap the waits
+COPY_WORKERS = (os.cpu_count() or 4) * 4
+
 # =========================
 # ====== UTILITIES ========
 # =========================
 NUM_RE = re.compile(r'^[+-]?(?:\d+\.?\d*|\.\d+)$')
+_NUM_START = frozenset('+-.0123456789')
 
 def _safe_float(s: str):
+    # Blank/non-numeric fields are rejected on the first char; anything NUM_RE
+    # accepts is a valid float literal, so no try/except is needed.
     s = s.strip()
-    if NUM_RE.match(s):
-        try:
-            return float(s)
-        except Exception:
-            return None
+    if s and s[0] in _NUM_START and NUM_RE.match(s):
+        return float(s)
     return None
 
 def parse_stations(meta_path: str) -> Dict[str, Tuple[float, float]]:
@@ -92,9 +97,10 @@ def parse_stations(meta_path: str) -> Dict[str, Tuple[float, float]]:
     return id2ll
 
 def station_ids_from_raw(raw_dir: str) -> Iterable[str]:
-    for fn in os.listdir(raw_dir):
-        if fn.lower().endswith('.csv'):
-            yield fn[:-4]
+    with os.scandir(raw_dir) as it:
+        for e in it:
+            if e.name.lower().endswith('.csv') and e.is_file():
+                yield e.name[:-4]
 
 def expand_bbox(bbox, buffer_deg: float):
     lon_min, lon_max, lat_min, lat_max = bbox
@@ -110,15 +116,60 @@ def select_ids_by_bbox(id2ll: Dict[str, Tuple[float, float]], bbox) -> set[str]:
             selected.add(sid)
     return selected
 
-def copy_selected(raw_dir: str, out_dir: str, ids: Iterable[str]) -> int:
-    ids_set = set(ids)
-    copied = 0
-    for sid in ids_set:
-        src = os.path.join(raw_dir, f'{sid}.csv')
-        if os.path.exists(src):
-            shutil.copy2(src, os.path.join(out_dir, f'{sid}.csv'))
-            copied += 1
-    return copied
+def _fast_copy(src: str, dst: str, allow_hardlink: bool = True) -> None:
+    """
+    Copy src -> dst as cheaply as the filesystem allows:
+    hardlink first (no data moved), then os.copy_file_range (kernel-side,
+    reflink on XFS/Btrfs), finally shutil.copy2.
+
+    Never writes through an existing dst (on a rerun it may be a hardlink to
+    src): the new file is built under a temp name and os.replace()d onto dst.
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return  # already linked by a previous run
+    tmp = f'{dst}.tmp'
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    try:
+        if allow_hardlink:
+            try:
+                os.link(src, tmp)
+                os.replace(tmp, dst)
+                return
+            except OSError as e:
+                # Cross-device / unsupported / not permitted -> copy instead
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EACCES,
+                                   errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+                    raise
+        try:
+            with open(src, 'rb') as s, open(tmp, 'wb') as d:
+                remaining = os.fstat(s.fileno()).st_size
+                while remaining > 0:
+                    n = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                    if n == 0:
+                        break
+                    remaining -= n
+            if remaining == 0:
+                shutil.copystat(src, tmp)
+                os.replace(tmp, dst)
+                return
+        except (OSError, AttributeError):
+            pass
+        shutil.copy2(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        if os.path.lexists(tmp):
+            os.remove(tmp)
+
+def copy_selected(raw_dir: str, out_dir: str, ids: Iterable[str], allow_hardlink: bool = True) -> int:
+    # One directory listing instead of an os.path.exists() per station
+    with os.scandir(raw_dir) as it:
+        available = {e.name for e in it if e.name.lower().endswith('.csv')}
+    pairs = [(os.path.join(raw_dir, f'{sid}.csv'), os.path.join(out_dir, f'{sid}.csv'))
+             for sid in set(ids) if f'{sid}.csv' in available]
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS) as ex:
+        list(ex.map(lambda p: _fast_copy(p[0], p[1], allow_hardlink), pairs))
+    return len(pairs)
 
 def write_list(path: str, items: List[str]):
     with open(path, 'w', encoding='utf-8') as f:
@@ -128,6 +179,12 @@ def write_list(path: str, items: List[str]):
 # ========= MAIN ==========
 # =========================
 if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Split GHCN-Daily station CSVs by lon/lat boxes')
+    parser.add_argument('--allow-hardlink', action=argparse.BooleanOptionalAction, default=True,
+                        help='hardlink instead of copying when possible (use --no-allow-hardlink across filesystems)')
+    args = parser.parse_args()
+
     # Load metadata & available files
     id2ll = parse_stations(META_FILE)
     file_ids = set(station_ids_from_raw(RAW_DIR))
@@ -152,8 +209,8 @@ if __name__ == '__main__':
     write_list(os.path.join(REPORT_DIR, 'missing_in_raw_big_window.txt'), missing_big)
 
     # Copy
-    n1 = copy_selected(RAW_DIR, OUT_BASIN, ids_basin_to_copy)
-    n2 = copy_selected(RAW_DIR, OUT_BIGWIN, ids_bigwin_to_copy)
+    n1 = copy_selected(RAW_DIR, OUT_BASIN, ids_basin_to_copy, args.allow_hardlink)
+    n2 = copy_selected(RAW_DIR, OUT_BIGWIN, ids_bigwin_to_copy, args.allow_hardlink)
 
     # Reports
     try: